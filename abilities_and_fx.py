@@ -5,6 +5,8 @@ class Binding:
     '''\
         Represent a fixing of each of the parameters of an effect to apply.
     '''
+    __slots__ = ("actor", "ability", "target_subscope")
+
     def __init__(self, actor, ability, target_subscope):
         self.actor = actor
         self.ability = ability
@@ -17,6 +19,127 @@ class Binding:
         return "| {} | {} | {} |".format(self.actor, self.ability, self.target_subscope)
 
 
+class BindingSequence:
+    '''\
+        Lazy sequence of the Bindings of one ability for one actor over a sequence of
+        target subscopes (e.g., a combat declaration space); a Binding is only built
+        when it is indexed, iterated over or sampled.
+    '''
+    def __init__(self, actor, ability, target_subscopes):
+        self.actor = actor
+        self.ability = ability
+        self.target_subscopes = target_subscopes
+
+    def bind(self, target_subscope):
+        return Binding(actor=self.actor, ability=self.ability, target_subscope=target_subscope)
+
+    @property
+    def size(self):
+        return size_of(self.target_subscopes)
+
+    def sample(self, rng=np.random, k=1):
+        if hasattr(self.target_subscopes, "sample"):
+            return [self.bind(t) for t in self.target_subscopes.sample(rng, k)]
+        return [self[random_below(self.size, rng)] for _ in range(k)]
+
+    def __len__(self):
+        return len(self.target_subscopes)
+
+    def __bool__(self):
+        return self.size > 0
+
+    def __getitem__(self, index):
+        return self.bind(self.target_subscopes[index])
+
+    def index(self, binding):
+        '''\
+            Return the index of binding by the rank of its target subscope; a lazy
+            space ranks it without generating any other target subscope.
+        '''
+        if (binding is None) or (binding.actor is not self.actor) or (binding.ability is not self.ability):
+            raise ValueError("{} is not in this BindingSequence.".format(binding))
+        return self.target_subscopes.index(binding.target_subscope)
+
+    def __iter__(self):
+        return (self.bind(target_subscope) for target_subscope in self.target_subscopes)
+
+
+class LegalActionSequence:
+    '''\
+        Lazy sequence of every Binding open to an actor: the pass binding first, then
+        the Bindings of each of their abilities in turn; the same order in which
+        Game.solve_affordance_bindings() lists them. Only the per-ability counts of
+        target subscopes are computed up front, so indexing builds a single Binding.
+    '''
+    def __init__(self, actor, pass_binding, binding_sequences):
+        self.actor = actor
+        self.pass_binding = pass_binding
+        self.binding_sequences = [sequence for sequence in binding_sequences if sequence.size]
+        # offsets[i] = index of the first Binding of binding_sequences[i].
+        self.offsets = list(accumulate([1] + [sequence.size for sequence in self.binding_sequences]))
+        # NOTE # A Python int; len() overflows past sys.maxsize (e.g., on a large board).
+        self.size = self.offsets[-1]
+
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return True
+
+    def __getitem__(self, index):
+        if (index < 0):
+            index += self.size
+        if not(0 <= index < self.size):
+            raise IndexError("LegalActionSequence index out of range.")
+        if (index == 0):
+            return self.pass_binding
+        i = bisect_right(self.offsets, index) - 1
+        return self.binding_sequences[i][index - self.offsets[i]]
+
+    def index(self, binding):
+        if (binding is self.pass_binding):
+            return 0
+        for (offset, sequence) in zip(self.offsets, self.binding_sequences):
+            if (binding.actor is sequence.actor) and (binding.ability is sequence.ability):
+                return offset + sequence.index(binding)
+        raise ValueError("{} is not in this LegalActionSequence.".format(binding))
+
+    def __iter__(self):
+        return chain([self.pass_binding], *self.binding_sequences)
+
+    def __repr__(self):
+        return "LegalActionSequence(actor={}, n_actions={})".format(self.actor, self.size)
+
+
+def same_binding(binding, option):
+    if (binding is option):
+        return True
+    if (binding is None) or (option is None):
+        return False
+    return ((binding.actor is option.actor) and (binding.ability is option.ability)
+            and (binding.target_subscope == option.target_subscope))
+
+
+def option_index(options, option):
+    '''\
+        Return the index among options of a chosen option (e.g., one a solver built
+        rather than chose by index); Bindings are compared by (actor, ability,
+        target_subscope), since lazy options build new ones on demand. The options
+        rank it when they can; the linear scan is only the fallback for those which
+        cannot (or which rank it wrongly).
+    '''
+    try:
+        index = options.index(option)
+    except (AttributeError, NotImplementedError, ValueError):
+        index = None
+    if (index is not None) and same_binding(options[index], option):
+        return index
+    for i, candidate in enumerate(options):
+        if same_binding(candidate, option):
+            return i
+    raise ValueError("The chosen option {} is not among the options offered.".format(option))
+
+
 class Effect:
     '''\
         Simplified version of a one shot effect.
@@ -36,7 +159,8 @@ class Effect:
         victim_stat_operand = getattr(victim_stats, self.victim_stat_key)
         new_value = self.operation(victim_stat_operand, actor_stat_operand)
         setattr(victim_stats, self.victim_stat_key, new_value)
-        print("{}'s {} {} ---> {}".format(victim, self.victim_stat_key, victim_stat_operand, new_value))
+        tick_mutation_clock(actor.environment)
+        announce_to(actor.environment, ANNOUNCE_INFO, "ACTION", "{}'s {} {} ---> {}", victim, self.victim_stat_key, victim_stat_operand, new_value)
 
 
 class Entailment:
@@ -78,11 +202,20 @@ class Ability:
         self.itsallbeendone = False
 
     def apply(self, actor, victims):
-        print("{} used {}".format(actor, self.__repr__()))
+        announce_to(actor.environment, ANNOUNCE_INFO, "ACTION", "{} used {}", actor, self)
         for victim in victims:
-            print("{} used {} against {}".format(actor, self.__repr__(), victim))
+            announce_to(actor.environment, ANNOUNCE_INFO, "ACTION", "{} used {} against {}", actor, self, victim)
             self.effect.apply(actor, victim)
-        self.itsallbeendone = True
+        self.mark_done(actor.environment)
+
+    def mark_done(self, environment):
+        '''\
+            Set itsallbeendone, ticking the mutation clock of environment (the Game it
+            was done in) if that changes anything; abilities may be shared by Games.
+        '''
+        if not(self.itsallbeendone):
+            self.itsallbeendone = True
+            tick_mutation_clock(environment)
 
     @property
     def antecedents_verified(self):
@@ -117,7 +250,7 @@ class NullAbility(Ability):
         raise NotImplementedError("NullAbility cannot solve target subscopes.")
 
     def apply(self, actor, victims=[]):
-        print("{} used {}".format(actor, self.__repr__()))
+        announce_to(actor.environment, ANNOUNCE_INFO, "ACTION", "{} used {}", actor, self)
 
 
 ABILITY_NULL = NullAbility()
@@ -6,6 +6,40 @@ from top import *
 ###################################################################
 
 
+# NOTE # Shared across Games so that combat shapes recurring across simulations are
+#        only ever solved once; see cached_declare_attackers and
+#        cached_solve_blocker_declarations.
+COMBAT_DECLARATION_CACHE = LRUCache(maxsize=256)
+
+
+# NOTE # Attributes of a Piece which bear on combat; Pieces which agree on all of
+#        them are interchangeable as far as enumerating declarations is concerned.
+COMBAT_SIGNATURE_ATTRIBUTES = ("p", "t",
+                               "marked_damage", "touched_by_death",
+                               "has_deathtouch", "has_lifelink", "has_trample",
+                               "is_creature", "is_planeswalker",
+                               "min_block_n", "max_block_n",
+                               "cannot_attack", "cannot_block",
+                               "cannot_attack_alone", "cannot_block_alone",
+                               "must_attack_if_able", "must_block_if_able",
+                               "must_be_blocked_if_able", "must_be_attacked_if_able")
+
+
+def combat_signature(piece):
+    return tuple(getattr(piece, attribute) for attribute in COMBAT_SIGNATURE_ATTRIBUTES)
+
+
+def group_by_combat_signature(pieces):
+    '''\
+        Partition pieces into lists of interchangeable pieces, in order of first
+        appearance.
+    '''
+    groups = {}
+    for piece in pieces:
+        groups.setdefault(combat_signature(piece), []).append(piece)
+    return list(groups.values())
+
+
 def validate_blocker_restrictions(declared_blockers, n_declared_blockers):
     result = True
     for blocker in declared_blockers:
@@ -48,19 +82,232 @@ def validate_attacker_declaration(tuple_of_tuples):
     return False
 
 
+def attacker_options(attacker, attackables):
+    '''\
+        Return the choices available to a single attacker in a declaration:
+        None (i.e., not attacking) followed by each attackable it may attack.
+    '''
+    # Case: The attacker may not attack at all; it can only sit this one out.
+    if attacker.cannot_attack:
+        return [None]
+    return [None] + list(attackables)
+
+
+def iter_attacker_declarations(attackers, attackables):
+    '''\
+        Lazily generate every legal declaration of attackers, each of which is a
+        tuple of (attacker, attackable) tuples.
+
+        Each attacker independently chooses not to attack or exactly one attackable,
+        so only well-formed declarations are ever built: the legal space has at most
+        (|attackables| + 1) ** |attackers| members instead of the 2 ** (|attackers| *
+        |attackables|) subsets of attackers X attackables.
+    '''
+    basis = [attacker_options(attacker, attackables) for attacker in attackers]
+    for choices in product(*basis):
+        declaration = tuple((attacker, attackable)
+                            for (attacker, attackable) in zip(attackers, choices)
+                            if (attackable is not None))
+        n_declared_attackers = len(declaration)
+        # Case: Nobody is attacking; that is the pass, not a declaration.
+        if not(n_declared_attackers):
+            continue
+        # Case: A lone attacker which cannot attack alone.
+        if (n_declared_attackers == 1):
+            if declaration[0][0].cannot_attack_alone:
+                continue
+        yield declaration
+
+
+def iter_canonical_attacker_declarations(attackers, attackables, weighted=False):
+    '''\
+        Lazily generate one representative declaration of attackers per class of
+        declarations which differ only by swapping interchangeable attackers (see
+        group_by_combat_signature). With weighted, yield 2-tuples of the form
+        (declaration, number of declarations of iter_attacker_declarations it stands for).
+    '''
+    groups = group_by_combat_signature(attackers)
+    group_options = [attacker_options(group[0], attackables) for group in groups]
+    basis = [list(multiset_assignments(len(options), len(group)))
+             for (group, options) in zip(groups, group_options)]
+    for choices in product(*basis):
+        declaration = []
+        weight = 1
+        for (group, options, (choice, multiplicity)) in zip(groups, group_options, choices):
+            weight *= multiplicity
+            for (attacker, option_index) in zip(group, choice):
+                if option_index:
+                    declaration.append((attacker, options[option_index]))
+        n_declared_attackers = len(declaration)
+        # Case: Nobody is attacking; that is the pass, not a declaration.
+        if not(n_declared_attackers):
+            continue
+        # Case: A lone attacker which cannot attack alone.
+        if (n_declared_attackers == 1):
+            if declaration[0][0].cannot_attack_alone:
+                continue
+        if weighted:
+            yield (tuple(declaration), weight)
+        else:
+            yield tuple(declaration)
+
+
 def declare_attackers(attackers, attackables):
     if attackers:
         if attackables:
-            attackers_X_attackables = product(attackers, attackables)
-            # NOTE #
-            # declarations_to_filter is a generator which yields tuples containing
-            # tuples containing ProxyPlayers or ProxyPieces.
-            declarations_to_filter = subpowerset(attackers_X_attackables, n=1, N=len(attackers))
-            filtered_declarations = filter(lambda dec: validate_attacker_declaration(dec), declarations_to_filter)
-            return list(filtered_declarations)
+            return list(iter_attacker_declarations(attackers, attackables))
     return None
 
 
+def attacker_declaration_signature(attackers, attackables):
+    '''\
+        Identity-free key determining iter_attacker_declarations(attackers, attackables)
+        up to the Pieces and Players involved.
+    '''
+    return ("attackers",
+            tuple((attacker.cannot_attack, attacker.cannot_attack_alone) for attacker in attackers),
+            len(attackables))
+
+
+def cached_declare_attackers(attackers, attackables, cache=None):
+    '''\
+        As declare_attackers(), but memoized in cache (COMBAT_DECLARATION_CACHE by default)
+        as index-based templates which are re-bound to the given attackers and attackables.
+    '''
+    if not(attackers and attackables):
+        return None
+    if (cache is None):
+        cache = COMBAT_DECLARATION_CACHE
+    key = attacker_declaration_signature(attackers, attackables)
+    templates = cache.get(key)
+    # Case: Never seen this shape of declaration before; solve and memoize it.
+    if (templates is None):
+        attacker_idx = {id(attacker): i for i, attacker in enumerate(attackers)}
+        attackable_idx = {id(attackable): j for j, attackable in enumerate(attackables)}
+        templates = [tuple((attacker_idx[id(attacker)], attackable_idx[id(attackable)])
+                           for (attacker, attackable) in declaration)
+                     for declaration in iter_attacker_declarations(attackers, attackables)]
+        cache.put(key, templates)
+    return [tuple((attackers[i], attackables[j]) for (i, j) in template) for template in templates]
+
+
+def count_attacker_declarations(attackers, attackables):
+    '''\
+        Return the number of declarations iter_attacker_declarations(attackers, attackables)
+        would generate, without building any of them.
+    '''
+    if not(attackers and attackables):
+        return 0
+    n_attackables = len(attackables)
+    n_all_choices = prod(len(attacker_options(attacker, attackables)) for attacker in attackers)
+    # Discount the declaration in which nobody attacks, as well as each declaration
+    # where a lone attacker which cannot attack alone would be attacking.
+    n_lonely = sum(n_attackables for attacker in attackers
+                   if (attacker.cannot_attack_alone and not(attacker.cannot_attack)))
+    return n_all_choices - 1 - n_lonely
+
+
+def attacked_by_attacker(attackers, declaration_of_attackers):
+    '''\
+        Return a dictionary of the form id(attacker) -> attackable of a declaration of
+        attackers, raising ValueError if it declares any attacker not among attackers.
+    '''
+    attacker_ids = set(map(id, attackers))
+    attacked = {}
+    for (attacker, attackable) in declaration_of_attackers:
+        if not(id(attacker) in attacker_ids) or (id(attacker) in attacked):
+            raise ValueError("{} is not an attacker of this declaration space.".format(attacker))
+        attacked[id(attacker)] = attackable
+    return attacked
+
+
+class AttackerDeclarationSpace(MixedRadixSpace):
+    '''\
+        Random access view of iter_attacker_declarations(attackers, attackables), in the
+        same order. Digit i picks attacker_options(attackers[i], attackables)[digit]; the
+        ranks where nobody attacks, or where a lone attacker cannot attack alone, are
+        excluded.
+    '''
+    def __init__(self, attackers, attackables):
+        self.attackers = list(attackers)
+        self.attackables = list(attackables)
+        self.basis = [attacker_options(attacker, self.attackables) for attacker in self.attackers]
+        radices = [len(options) for options in self.basis]
+        # Case: Nobody attacking.
+        excluded_ranks = [0]
+        weight = 1
+        for i in reversed(range(len(self.attackers))):
+            if self.attackers[i].cannot_attack_alone:
+                # Case: Only attackers[i] attacking.
+                excluded_ranks.extend(digit * weight for digit in range(1, radices[i]))
+            weight *= radices[i]
+        super().__init__(radices, excluded_ranks)
+
+    def decode(self, digits):
+        return tuple((attacker, options[digit])
+                     for (attacker, options, digit) in zip(self.attackers, self.basis, digits)
+                     if digit)
+
+    def encode(self, declaration):
+        attacked = attacked_by_attacker(self.attackers, declaration)
+        return [index_by_identity(options, attacked.get(id(attacker)))
+                for (attacker, options) in zip(self.attackers, self.basis)]
+
+    def __iter__(self):
+        return iter_attacker_declarations(self.attackers, self.attackables)
+
+
+# NOTE # 509.1c / 508.1d: Among the legal declarations, only those which obey the maximum
+#        possible number of requirements (e.g., "must attack if able") are allowed.
+#        The maxima are solved in polynomial time as flows over the incidence between
+#        the pieces subject to requirements, rather than by enumerating declarations.
+def max_satisfiable_attack_requirements(attackers, attackables):
+    '''\
+        Return the maximum number of attack requirements (must_attack_if_able on
+        attackers; must_be_attacked_if_able on attackables) which any declaration of
+        iter_attacker_declarations(attackers, attackables) obeys.
+    '''
+    able_attackers = [attacker for attacker in attackers if not(attacker.cannot_attack)]
+    required_attackables = [attackable for attackable in attackables
+                            if getattr(attackable, "must_be_attacked_if_able", False)]
+    # Case: Nobody is able to attack; or, the only one able cannot attack alone.
+    if not(able_attackers) or not(attackables):
+        return 0
+    if (len(able_attackers) == 1) and able_attackers[0].cannot_attack_alone:
+        return 0
+
+    # Each able attacker may attack one attackable, so may satisfy at most one
+    # must_be_attacked_if_able requirement; any able attacker may join the attack.
+    capacities = {}
+    for i, attacker in enumerate(able_attackers):
+        capacities[("source", ("attacker", i))] = 1
+        for j, attackable in enumerate(required_attackables):
+            capacities[(("attacker", i), ("attackable", j))] = 1
+    for j, attackable in enumerate(required_attackables):
+        capacities[(("attackable", j), "sink")] = 1
+    n_must_attack = sum(1 for attacker in able_attackers if attacker.must_attack_if_able)
+    return n_must_attack + max_flow(capacities, "source", "sink")
+
+
+def count_obeyed_attack_requirements(declaration_of_attackers):
+    n_obeyed = sum(1 for (attacker, attackable) in declaration_of_attackers if attacker.must_attack_if_able)
+    attacked = set(attackable for (attacker, attackable) in declaration_of_attackers)
+    n_obeyed += sum(1 for attackable in attacked if getattr(attackable, "must_be_attacked_if_able", False))
+    return n_obeyed
+
+
+def filter_maximally_obedient(declarations, count_obeyed, maximum):
+    '''\
+        Lazily filter declarations down to those which obey maximum requirements, as
+        counted by count_obeyed; declarations is returned untouched when there are none
+        to obey. To restrict a declaration space without enumerating it, see
+        obedient_attacker_declarations() and obedient_blocker_declarations().
+    '''
+    if not(maximum):
+        return declarations
+    return (declaration for declaration in declarations if (count_obeyed(declaration) == maximum))
+
+
 def return_attackers(declaration_of_attackers):
     return [t[0] for t in declaration_of_attackers]
 
@@ -79,6 +326,16 @@ def which_attacker_subsets(subP_A, b):
     return result
 
 
+def count_attacker_subsets(n_attackers, b):
+    '''\
+        Return the number of subsets of n_attackers attackers which
+        which_attacker_subsets() would deem legal for b.
+    '''
+    lower = max(1, b.min_block_n)
+    upper = min(n_attackers, b.max_block_n)
+    return sum(comb(n_attackers, r) for r in range(lower, upper + 1))
+
+
 def translate_into_blocker_declaration(bt, tuple_of_tuple_of_attackers):
     '''\
         Alter representation of a pairing of attackers_to_block for each blocker
@@ -101,12 +358,14 @@ def invert_blocker_declaration(blocker_declaration):
         blockers that will be blocking that attacker.
     '''
     inverse_blocker_declaration = dict()
-    unique_attackers_being_blocked = set([])
+    # NOTE # Kept in order of first appearance (rather than as a set) so that the keys,
+    #        and so the damage assignment orders offered, do not depend on object ids.
+    unique_attackers_being_blocked = dict()
 
     # Take the union of the attackers being blocked in this declaration to act
     # as the keys of the inverse declaration.
     for choice_of_attackers_to_block in blocker_declaration.values():
-        unique_attackers_being_blocked |= set(choice_of_attackers_to_block)
+        unique_attackers_being_blocked.update(dict.fromkeys(choice_of_attackers_to_block))
 
     # Collect the blockers who will be blocking this attacker according to the
     # blocker_declaration.
@@ -119,30 +378,633 @@ def invert_blocker_declaration(blocker_declaration):
     return inverse_blocker_declaration
 
 
-def solve_blocker_declarations(A, B):
+def iter_blocker_declarations(A, B):
     '''\
-        Given a list of attackers who are attacking, and a list of possible blockers,
-        return a list of dictionaries where each dictionary is of the form:
-            key   : unique choice of blocker
-            value : tuple of attackers they will be blocking
+        Lazily generate the blocker declarations of solve_blocker_declarations(A, B),
+        in the same order, one translated dictionary at a time. Nothing beyond the
+        legal attacker subsets of the current choice of blockers is held in memory,
+        so callers may stop early (see top.take) or sample (see top.reservoir_sample)
+        without ever materialising the whole space.
     '''
     # All possible ways to select >=1 a in A.
     # NOTE # Cast as list since it needs to be re-used.
     subP_A = list(subpowerset(A, n=1, N=None))
 
     # All possible ways to select >=1 b in B.
-    # NOTE # This one can be left as a generator as opposed to the one above.
     subP_B = subpowerset(B, n=1, N=None)
 
-    result = []
     for choice_of_blockers in subP_B:
         basis = [which_attacker_subsets(subP_A, blocker) for blocker in choice_of_blockers]
-        tuples_mapping_attackers_to_block_for_each_blocker_in_choice_of_blockers = list(product(*basis))
-        for tuple_to_translate in tuples_mapping_attackers_to_block_for_each_blocker_in_choice_of_blockers:
-            result.append(translate_into_blocker_declaration(choice_of_blockers, tuple_to_translate))
+        # NOTE # product() is consumed lazily; only its (small) basis is materialised.
+        for tuple_to_translate in product(*basis):
+            yield translate_into_blocker_declaration(choice_of_blockers, tuple_to_translate)
 
 
-    return result
+def iter_canonical_blocker_declarations(A, B, weighted=False):
+    '''\
+        Lazily generate one representative blocker declaration per class of declarations
+        which differ only by swapping interchangeable blockers (see group_by_combat_signature).
+        With weighted, yield 2-tuples of the form (declaration, number of declarations of
+        solve_blocker_declarations it stands for).
+        # NOTE # Interchangeable attackers are still treated as distinct.
+    '''
+    subP_A = list(subpowerset(A, n=1, N=None))
+    groups = group_by_combat_signature(B)
+    group_options = [[None] + which_attacker_subsets(subP_A, group[0]) for group in groups]
+    basis = [list(multiset_assignments(len(options), len(group)))
+             for (group, options) in zip(groups, group_options)]
+    for choices in product(*basis):
+        declaration = {}
+        weight = 1
+        for (group, options, (choice, multiplicity)) in zip(groups, group_options, choices):
+            weight *= multiplicity
+            for (blocker, option_index) in zip(group, choice):
+                if option_index:
+                    declaration[blocker] = options[option_index]
+        # Case: Nobody is blocking.
+        if not(declaration):
+            continue
+        if weighted:
+            yield (declaration, weight)
+        else:
+            yield declaration
+
+
+def solve_blocker_declarations(A, B):
+    '''\
+        Given a list of attackers who are attacking, and a list of possible blockers,
+        return a list of dictionaries where each dictionary is of the form:
+            key   : unique choice of blocker
+            value : tuple of attackers they will be blocking
+    '''
+    return list(iter_blocker_declarations(A, B))
+
+
+def blocker_declaration_signature(A, B):
+    '''\
+        Identity-free key determining solve_blocker_declarations(A, B) up to the
+        Pieces involved.
+    '''
+    return ("blockers",
+            len(A),
+            tuple((blocker.min_block_n, blocker.max_block_n) for blocker in B))
+
+
+def bind_blocker_declaration_template(A, B, template):
+    '''\
+        Re-bind an index-based blocker declaration template, i.e., a tuple of
+        (blocker index, tuple of attacker indices) tuples, to Pieces.
+    '''
+    return {B[j]: tuple(A[i] for i in attacker_indices) for (j, attacker_indices) in template}
+
+
+def cached_solve_blocker_declarations(A, B, cache=None):
+    '''\
+        As solve_blocker_declarations(), but memoized in cache (COMBAT_DECLARATION_CACHE
+        by default) as index-based templates which are re-bound to the given A and B.
+    '''
+    if (cache is None):
+        cache = COMBAT_DECLARATION_CACHE
+    key = blocker_declaration_signature(A, B)
+    templates = cache.get(key)
+    # Case: Never seen this shape of combat before; solve and memoize it.
+    if (templates is None):
+        attacker_idx = {id(attacker): i for i, attacker in enumerate(A)}
+        blocker_idx = {id(blocker): j for j, blocker in enumerate(B)}
+        templates = [tuple((blocker_idx[id(blocker)], tuple(attacker_idx[id(attacker)] for attacker in attackers))
+                           for (blocker, attackers) in declaration.items())
+                     for declaration in iter_blocker_declarations(A, B)]
+        cache.put(key, templates)
+    return [bind_blocker_declaration_template(A, B, template) for template in templates]
+
+
+def solve_blocker_declaration_templates(n_attackers, block_bounds, choices_of_blockers):
+    '''\
+        Solve the index-based templates (see bind_blocker_declaration_template) of the
+        blocker declarations for each given choice of blocker indices, in order, where:
+            n_attackers  : the number of attackers
+            block_bounds : a (min_block_n, max_block_n) tuple for every blocker
+        Only plain ints cross the process boundary to and from this function.
+    '''
+    subP_A = list(subpowerset(range(n_attackers), n=1, N=None))
+    templates = []
+    for choice_of_blockers in choices_of_blockers:
+        basis = []
+        for j in choice_of_blockers:
+            (min_block_n, max_block_n) = block_bounds[j]
+            basis.append([attacker_subset for attacker_subset in subP_A
+                          if (min_block_n <= len(attacker_subset) <= max_block_n)])
+        for tuple_to_translate in product(*basis):
+            templates.append(tuple(zip(choice_of_blockers, tuple_to_translate)))
+    return templates
+
+
+def iter_parallel_blocker_declarations(A, B, max_workers=None, chunk_size=64):
+    '''\
+        Generate the blocker declarations of solve_blocker_declarations(A, B), in the
+        same order, solving chunks of chunk_size choices of blockers across a pool of
+        max_workers processes. At most two chunks per worker are in flight at once;
+        the declarations of the oldest chunk are yielded as soon as it completes, so
+        memory stays bounded however far the caller iterates.
+    '''
+    n_attackers = len(A)
+    block_bounds = [(blocker.min_block_n, blocker.max_block_n) for blocker in B]
+    choices_of_blockers = subpowerset(range(len(B)), n=1, N=None)
+    chunks = iter(lambda: take(choices_of_blockers, chunk_size), [])
+    max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(solve_blocker_declaration_templates, n_attackers, block_bounds, chunk))
+            # Case: The window is full; wait on the oldest chunk before submitting more.
+            if (len(in_flight) >= max_in_flight):
+                for template in in_flight.popleft().result():
+                    yield bind_blocker_declaration_template(A, B, template)
+        while in_flight:
+            for template in in_flight.popleft().result():
+                yield bind_blocker_declaration_template(A, B, template)
+
+
+def parallel_solve_blocker_declarations(A, B, max_workers=None, chunk_size=64):
+    return list(iter_parallel_blocker_declarations(A, B, max_workers, chunk_size))
+
+
+def count_blocker_declarations(A, B):
+    '''\
+        Return the number of declarations solve_blocker_declarations(A, B) would
+        generate, without building any of them. Each blocker either does not block
+        or blocks one of its legal attacker subsets; discount the case where nobody
+        blocks.
+    '''
+    n_attackers = len(A)
+    return prod(1 + count_attacker_subsets(n_attackers, blocker) for blocker in B) - 1
+
+
+def blocked_by_blocker(A, B, blocker_declaration):
+    '''\
+        Return a dictionary of the form id(blocker) -> increasing tuple of the positions
+        in A of the attackers it blocks, raising ValueError if blocker_declaration names
+        any blocker not in B or attacker not in A.
+    '''
+    position = {id(attacker): i for i, attacker in enumerate(A)}
+    blocker_ids = set(map(id, B))
+    blocked = {}
+    for (blocker, attackers) in blocker_declaration.items():
+        if not(id(blocker) in blocker_ids) or not(all(id(attacker) in position for attacker in attackers)):
+            raise ValueError("{} blocking {} is not in this declaration space.".format(blocker, attackers))
+        blocked[id(blocker)] = tuple(sorted(set(position[id(attacker)] for attacker in attackers)))
+    return blocked
+
+
+class BlockerDeclarationSpace(MixedRadixSpace):
+    '''\
+        Random access view of the same declarations solve_blocker_declarations(A, B)
+        returns. Digit i is 0 when B[i] does not block, or k when B[i] blocks the
+        (k-1)-th subset of A that is legal for it; the rank where nobody blocks is
+        excluded. Note that the order differs from that of solve_blocker_declarations().
+    '''
+    def __init__(self, A, B):
+        self.A = list(A)
+        self.B = list(B)
+        n_attackers = len(self.A)
+        self.bounds = [(max(1, blocker.min_block_n), min(n_attackers, blocker.max_block_n))
+                       for blocker in self.B]
+        radices = [1 + count_attacker_subsets(n_attackers, blocker) for blocker in self.B]
+        super().__init__(radices, [0])
+
+    def decode(self, digits):
+        declaration = {}
+        for (blocker, (lower, upper), digit) in zip(self.B, self.bounds, digits):
+            if digit:
+                declaration[blocker] = unrank_subpowerset(self.A, lower, upper, digit - 1)
+        return declaration
+
+    def encode(self, declaration):
+        blocked = blocked_by_blocker(self.A, self.B, declaration)
+        digits = []
+        for (blocker, (lower, upper)) in zip(self.B, self.bounds):
+            indices = blocked.get(id(blocker))
+            if (indices is None):
+                digits.append(0)
+            elif (lower <= len(indices) <= upper):
+                digits.append(1 + rank_subpowerset(indices, lower, len(self.A)))
+            else:
+                raise ValueError("{} may not block {} attackers.".format(blocker, len(indices)))
+        return digits
+
+    def __iter__(self):
+        basis = [[None] + list(subpowerset(self.A, lower, upper)) for (lower, upper) in self.bounds]
+        choices = product(*basis)
+        # Skip the choice where nobody blocks.
+        next(choices)
+        for choice in choices:
+            yield {blocker: attackers
+                   for (blocker, attackers) in zip(self.B, choice)
+                   if (attackers is not None)}
+
+
+def max_satisfiable_block_requirements(A, B):
+    '''\
+        Return the maximum number of block requirements (must_block_if_able on blockers;
+        must_be_blocked_if_able on attackers) which any declaration of
+        solve_blocker_declarations(A, B) obeys.
+        # NOTE # Blocker restrictions are not taken into account, just as they are not
+        #        by solve_blocker_declarations().
+    '''
+    n_attackers = len(A)
+    able_blockers = [blocker for blocker in B if count_attacker_subsets(n_attackers, blocker)]
+    required_attackers = [attacker for attacker in A if attacker.must_be_blocked_if_able]
+
+    # Each able blocker may block up to min(max_block_n, |A|) attackers (padding up to
+    # min_block_n with any others), so may satisfy that many must_be_blocked_if_able
+    # requirements; any able blocker may block.
+    capacities = {}
+    for i, blocker in enumerate(able_blockers):
+        capacities[("source", ("blocker", i))] = min(n_attackers, blocker.max_block_n)
+        for j, attacker in enumerate(required_attackers):
+            capacities[(("blocker", i), ("attacker", j))] = 1
+    for j, attacker in enumerate(required_attackers):
+        capacities[(("attacker", j), "sink")] = 1
+    n_must_block = sum(1 for blocker in able_blockers if blocker.must_block_if_able)
+    return n_must_block + max_flow(capacities, "source", "sink")
+
+
+def count_obeyed_block_requirements(blocker_declaration):
+    n_obeyed = sum(1 for blocker in blocker_declaration if blocker.must_block_if_able)
+    blocked = set([])
+    for attackers in blocker_declaration.values():
+        blocked |= set(attackers)
+    n_obeyed += sum(1 for attacker in blocked if attacker.must_be_blocked_if_able)
+    return n_obeyed
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+class ObedientDeclarationSpace(MixedRadixSpace):
+    '''\
+        Random access view of the declarations which obey the maximum number of
+        requirements, built without enumerating those which do not. Digit i picks a
+        choice of piece i among choice_groups[i], a list of 3-tuples of the form
+        (mask, count, choice_at) where mask flags the required pieces on the other
+        side that each of the count choices choice_at(0), ..., choice_at(count - 1)
+        covers; a declaration is kept when its digits cover n_covered of them.
+        Pieces which must act if able are pinned by leaving out their None choice.
+
+        Unlike a MixedRadixSpace, the radix of a digit depends on the covered
+        required pieces before it; ways(i, covered) counts the completions of digits
+        i, ... from there, and is memoized (it is exponential only in the number of
+        required pieces, which is small).
+    '''
+    def __init__(self, choice_groups, n_covered, excluded_choices=()):
+        self.choice_groups = choice_groups
+        self.n_covered = n_covered
+        self.memo = {}
+        self.radices = [sum(count for (_, count, _) in groups) for groups in choice_groups]
+        self.excluded_ranks = sorted(set(rank for rank in map(self.rank, excluded_choices)
+                                         if (rank is not None)))
+        self.size = self.ways(0, 0) - len(self.excluded_ranks)
+
+    def ways(self, i, covered):
+        if (i == len(self.choice_groups)):
+            return 1 if (popcount(covered) == self.n_covered) else 0
+        key = (i, covered)
+        result = self.memo.get(key)
+        if (result is None):
+            result = sum(count * self.ways(i + 1, covered | mask)
+                         for (mask, count, _) in self.choice_groups[i])
+            self.memo[key] = result
+        return result
+
+    def rank(self, group_choices):
+        '''\
+            Return the rank of the declaration given as a list of 2-tuples of the form
+            (index into choice_groups[i], index of the choice in that group), one per
+            digit, or None if it does not obey the maximum number of requirements.
+        '''
+        rank = 0
+        covered = 0
+        for i, (g, a) in enumerate(group_choices):
+            groups = self.choice_groups[i]
+            for (mask, count, _) in groups[:g]:
+                rank += count * self.ways(i + 1, covered | mask)
+            covered |= groups[g][0]
+            rank += a * self.ways(i + 1, covered)
+        if (popcount(covered) != self.n_covered):
+            return None
+        return rank
+
+    def index(self, element):
+        rank = self.rank(self.encode(element))
+        if (rank is None):
+            raise ValueError("{} does not obey the maximum number of requirements.".format(element))
+        return self.exclude_from_rank(rank)
+
+    def unrank(self, index):
+        rank = index
+        for excluded_rank in self.excluded_ranks:
+            if (excluded_rank <= rank):
+                rank += 1
+            else:
+                break
+        choices = []
+        covered = 0
+        for i, groups in enumerate(self.choice_groups):
+            for (mask, count, choice_at) in groups:
+                n_ways = self.ways(i + 1, covered | mask)
+                if (rank < count * n_ways):
+                    a, rank = divmod(rank, n_ways)
+                    choices.append(choice_at(a))
+                    covered |= mask
+                    break
+                rank -= count * n_ways
+        return self.decode(choices)
+
+
+def group_choices_by_mask(choices, mask_of):
+    '''\
+        Return the choice groups (see ObedientDeclarationSpace) of a list of choices,
+        grouped by mask_of(choice) in order of first appearance.
+    '''
+    grouped = {}
+    for choice in choices:
+        grouped.setdefault(mask_of(choice), []).append(choice)
+    return [(mask, len(group), group.__getitem__) for (mask, group) in grouped.items()]
+
+
+class ObedientAttackerDeclarationSpace(ObedientDeclarationSpace):
+    '''\
+        The declarations of AttackerDeclarationSpace(attackers, attackables) which obey
+        maximum attack requirements (see max_satisfiable_attack_requirements): every
+        able must_attack_if_able attacker attacks, and as many must_be_attacked_if_able
+        attackables as possible are attacked.
+    '''
+    def __init__(self, attackers, attackables, maximum):
+        self.attackers = list(attackers)
+        self.attackables = list(attackables)
+        required_idx = {id(attackable): j for j, attackable in
+                        enumerate(attackable for attackable in self.attackables
+                                  if getattr(attackable, "must_be_attacked_if_able", False))}
+
+        def mask_of(attackable):
+            if (attackable is None) or not(id(attackable) in required_idx):
+                return 0
+            return 1 << required_idx[id(attackable)]
+
+        choice_groups = []
+        n_must_attack = 0
+        for attacker in self.attackers:
+            options = attacker_options(attacker, self.attackables)
+            # Case: Able to attack, and must; pin it to attacking.
+            if attacker.must_attack_if_able and not(attacker.cannot_attack):
+                options = options[1:]
+                n_must_attack += 1
+            choice_groups.append(group_choices_by_mask(options, mask_of))
+
+        # Case: A lone attacker which cannot attack alone. (Nobody attacking never
+        #       obeys a non-zero maximum.)
+        excluded_choices = []
+        for i, attacker in enumerate(self.attackers):
+            if not(attacker.cannot_attack_alone) or attacker.cannot_attack:
+                continue
+            for attackable in self.attackables:
+                group_choices = [self.locate(choice_groups[j], attackable if (j == i) else None)
+                                 for j in range(len(self.attackers))]
+                if not(None in group_choices):
+                    excluded_choices.append(group_choices)
+        super().__init__(choice_groups, maximum - n_must_attack, excluded_choices)
+
+    @staticmethod
+    def locate(groups, choice):
+        for g, (_, count, choice_at) in enumerate(groups):
+            for a in range(count):
+                if (choice_at(a) is choice):
+                    return (g, a)
+        return None
+
+    def decode(self, choices):
+        return tuple((attacker, attackable)
+                     for (attacker, attackable) in zip(self.attackers, choices)
+                     if (attackable is not None))
+
+    def encode(self, declaration):
+        attacked = attacked_by_attacker(self.attackers, declaration)
+        group_choices = [self.locate(groups, attacked.get(id(attacker)))
+                         for (attacker, groups) in zip(self.attackers, self.choice_groups)]
+        if (None in group_choices):
+            raise ValueError("{} is not in this declaration space.".format(declaration))
+        return group_choices
+
+
+class ObedientBlockerDeclarationSpace(ObedientDeclarationSpace):
+    '''\
+        The declarations of BlockerDeclarationSpace(A, B) which obey maximum block
+        requirements (see max_satisfiable_block_requirements): every able
+        must_block_if_able blocker blocks, and as many must_be_blocked_if_able
+        attackers as possible are blocked. The choices of a blocker are grouped by
+        which required attackers they block; within a group, the other attackers
+        blocked are unranked as a subpowerset of the attackers not required.
+    '''
+    def __init__(self, A, B, maximum):
+        self.A = list(A)
+        self.B = list(B)
+        n_attackers = len(self.A)
+        position = {id(attacker): i for i, attacker in enumerate(self.A)}
+        required = [attacker for attacker in self.A if attacker.must_be_blocked_if_able]
+        others = [attacker for attacker in self.A if not(attacker.must_be_blocked_if_able)]
+
+        def subsets_covering(covering, lower, upper):
+            n_covering = len(covering)
+            lower_ = max(0, lower - n_covering)
+            upper_ = upper - n_covering
+
+            def choice_at(a):
+                chosen = covering + unrank_subpowerset(others, lower_, upper_, a)
+                return tuple(sorted(chosen, key=lambda attacker: position[id(attacker)]))
+            count = sum(comb(len(others), r) for r in range(lower_, upper_ + 1))
+            return (count, choice_at)
+
+        choice_groups = []
+        # group_coverings[i][g] = the indices into required which group g of B[i] blocks,
+        # or None for its group of not blocking; see encode().
+        self.group_coverings = []
+        self.bounds = []
+        n_must_block = 0
+        for blocker in self.B:
+            lower, upper = max(1, blocker.min_block_n), min(n_attackers, blocker.max_block_n)
+            groups = []
+            coverings = []
+            # Case: Able to block, and must; pin it to blocking.
+            if blocker.must_block_if_able and (lower <= upper):
+                n_must_block += 1
+            else:
+                groups.append((0, 1, lambda a: None))
+                coverings.append(None)
+            for covering in powerset(range(len(required))):
+                if (len(covering) > upper):
+                    break
+                count, choice_at = subsets_covering(tuple(required[j] for j in covering), lower, upper)
+                if count:
+                    groups.append((sum(1 << j for j in covering), count, choice_at))
+                    coverings.append(covering)
+            choice_groups.append(groups)
+            self.group_coverings.append(coverings)
+            self.bounds.append((lower, upper))
+        self.required_idx = {id(attacker): j for j, attacker in enumerate(required)}
+        self.others_idx = {id(attacker): k for k, attacker in enumerate(others)}
+        # NOTE # Nobody blocking never obeys a non-zero maximum; nothing is excluded.
+        super().__init__(choice_groups, maximum - n_must_block)
+
+    def decode(self, choices):
+        return {blocker: attackers
+                for (blocker, attackers) in zip(self.B, choices)
+                if (attackers is not None)}
+
+    def encode(self, declaration):
+        blocked = blocked_by_blocker(self.A, self.B, declaration)
+        group_choices = []
+        for (blocker, coverings, (lower, upper)) in zip(self.B, self.group_coverings, self.bounds):
+            indices = blocked.get(id(blocker))
+            # Case: Not blocking; only possible if it is not pinned to blocking.
+            if (indices is None):
+                group_choices.append((coverings.index(None), 0))
+                continue
+            if not(lower <= len(indices) <= upper):
+                raise ValueError("{} may not block {} attackers.".format(blocker, len(indices)))
+            attackers = [self.A[i] for i in indices]
+            covering = tuple(self.required_idx[id(attacker)] for attacker in attackers
+                             if (id(attacker) in self.required_idx))
+            other_indices = tuple(self.others_idx[id(attacker)] for attacker in attackers
+                                  if (id(attacker) in self.others_idx))
+            lower_ = max(0, lower - len(covering))
+            group_choices.append((coverings.index(covering),
+                                  rank_subpowerset(other_indices, lower_, len(self.others_idx))))
+        return group_choices
+
+
+def obedient_attacker_declarations(attackers, attackables):
+    '''\
+        Return the declarations of AttackerDeclarationSpace(attackers, attackables) which
+        obey the maximum number of attack requirements, as a random access space.
+    '''
+    maximum = max_satisfiable_attack_requirements(attackers, attackables)
+    if not(maximum):
+        return AttackerDeclarationSpace(attackers=attackers, attackables=attackables)
+    return ObedientAttackerDeclarationSpace(attackers, attackables, maximum)
+
+
+def obedient_blocker_declarations(A, B):
+    '''\
+        Return the declarations of BlockerDeclarationSpace(A, B) which obey the maximum
+        number of block requirements, as a random access space.
+    '''
+    maximum = max_satisfiable_block_requirements(A, B)
+    if not(maximum):
+        return BlockerDeclarationSpace(A=A, B=B)
+    return ObedientBlockerDeclarationSpace(A, B, maximum)
+
+
+def is_lethally_damaged(victim, damage_taken, deathtouched):
+    '''\
+        Whether victim would be lethally damaged (cf. Piece.lethally_damaged) after taking
+        damage_taken[victim] more damage, given the set of victims dealt damage by a
+        source with deathtouch.
+    '''
+    if victim.touched_by_death:
+        return True
+    amount = damage_taken.get(victim, 0)
+    if (victim in deathtouched) and (amount > 0):
+        return True
+    return (victim.marked_damage + amount) >= victim.t
+
+
+def assign_lethal_damage_greedily(source, victims, damage_taken, deathtouched):
+    '''\
+        Have source assign its power among victims so as to leave as many of them as
+        possible lethally damaged, cheapest first, accumulating into damage_taken and
+        deathtouched.
+    '''
+    def still_needed(victim):
+        if is_lethally_damaged(victim, damage_taken, deathtouched):
+            return 0
+        if source.has_deathtouch:
+            return 1
+        return victim.t - victim.marked_damage - damage_taken.get(victim, 0)
+
+    damage_left = source.p
+    for victim in sorted(victims, key=still_needed):
+        amount_to_deal = min(still_needed(victim), damage_left)
+        damage_taken[victim] = damage_taken.get(victim, 0) + amount_to_deal
+        damage_left -= amount_to_deal
+        if (amount_to_deal > 0) and source.has_deathtouch:
+            deathtouched.add(victim)
+    # Case: Damage left over after everything is dead goes to the last victim.
+    if (damage_left > 0) and victims:
+        damage_taken[victims[-1]] = damage_taken.get(victims[-1], 0) + damage_left
+
+
+def static_block_outcome(A, blocker_declaration):
+    '''\
+        Cheaply evaluate a blocker declaration against attackers A, assuming each side
+        distributes combat damage so as to kill as much as possible. Return a 3-tuple:
+            [0] damage dealt by unblocked attackers
+            [1] frozenset of blockers which end up lethally damaged
+            [2] frozenset of attackers which end up lethally damaged
+    '''
+    inverse_blocker_declaration = invert_blocker_declaration(blocker_declaration)
+    unblocked_damage = sum(attacker.p for attacker in A if not(attacker in inverse_blocker_declaration))
+
+    damage_taken = {}
+    deathtouched = set([])
+    for attacker, blockers in inverse_blocker_declaration.items():
+        assign_lethal_damage_greedily(attacker, blockers, damage_taken, deathtouched)
+    for blocker, attackers in blocker_declaration.items():
+        assign_lethal_damage_greedily(blocker, list(attackers), damage_taken, deathtouched)
+
+    blockers_lost = frozenset(blocker for blocker in blocker_declaration
+                              if is_lethally_damaged(blocker, damage_taken, deathtouched))
+    attackers_killed = frozenset(attacker for attacker in inverse_blocker_declaration
+                                 if is_lethally_damaged(attacker, damage_taken, deathtouched))
+    return (unblocked_damage, blockers_lost, attackers_killed)
+
+
+def block_outcome_dominates(x, y):
+    '''\
+        Whether, from the defending player's point of view, block outcome x is at
+        least as good as block outcome y in every respect.
+    '''
+    return (x[0] <= y[0]) and (x[1] <= y[1]) and (x[2] >= y[2])
+
+
+def prune_dominated_blocker_declarations(A, blocker_declarations):
+    '''\
+        Drop the blocker declarations whose static_block_outcome() is dominated by, or
+        identical to, that of another declaration. Return a 2-tuple of the form:
+            [0] list of the surviving declarations, in their original order
+            [1] the number of declarations pruned
+    '''
+    # Keep the first declaration for each distinct outcome.
+    representatives = {}
+    n_declarations = 0
+    for blocker_declaration in blocker_declarations:
+        n_declarations += 1
+        outcome = static_block_outcome(A, blocker_declaration)
+        if not(outcome in representatives):
+            representatives[outcome] = blocker_declaration
+
+    # Keep only the Pareto frontier of the distinct outcomes.
+    outcomes = list(representatives)
+    result = []
+    for outcome in outcomes:
+        dominated = False
+        for other_outcome in outcomes:
+            if (other_outcome != outcome) and block_outcome_dominates(other_outcome, outcome):
+                dominated = True
+                break
+        if not(dominated):
+            result.append(representatives[outcome])
+    return result, n_declarations - len(result)
 
 
 def derive_assignment_orders_(t):
@@ -170,13 +1032,122 @@ def derive_assignment_orders(ibd):
     return list(product(*new_basis))
 
 
+def count_assignment_orders(ibd):
+    '''\
+        Return the number of assignment orders derive_assignment_orders(ibd) would
+        generate, without building any of them.
+    '''
+    return prod(factorial(len(blockers)) for blockers in ibd.values())
+
+
+class AssignmentOrderSpace(MixedRadixSpace):
+    '''\
+        Random access view of derive_assignment_orders(ibd), in the same order.
+        Digit i selects a permutation of the i-th group of ibd by unranking it.
+    '''
+    def __init__(self, ibd):
+        self.items = list(ibd.items())
+        super().__init__([factorial(len(t[1])) for t in self.items])
+
+    def decode(self, digits):
+        result = []
+        for (t, digit) in zip(self.items, digits):
+            # Case: There aren't alternative assignment orders.
+            if (len(t[1]) < 2):
+                result.append(t)
+            else:
+                result.append((t[0], list(unrank_permutation(t[1], digit))))
+        return tuple(result)
+
+    def __iter__(self):
+        return product(*[derive_assignment_orders_(t) for t in self.items])
+
+
+def damage_outcome(p, damage_order):
+    '''\
+        Return the amounts of damage a source with power p would deal to each victim
+        in damage_order, following the semantics of Piece.mark_damage_on_victims().
+    '''
+    amounts = []
+    damage_left = p
+    last_victim_i = len(damage_order) - 1
+    for (victim_i, victim) in enumerate(damage_order):
+        # Case: The last victim takes whatever damage is left.
+        if (victim_i == last_victim_i):
+            amount_to_deal = damage_left
+        # Case: Cap the amount by the toughness of the victim.
+        else:
+            amount_to_deal = min(victim.t, damage_left)
+        damage_left -= amount_to_deal
+        amounts.append(amount_to_deal)
+    return amounts
+
+
+def derive_distinct_assignment_orders_(t):
+    '''\
+        As derive_assignment_orders_(t), but keep only one assignment order per distinct
+        outcome, i.e., per distinct amount of damage t[0] would deal to each of t[1].
+
+        Only the prefix of an order which receives damage matters: once the damage
+        runs out (or only one victim is left) the rest of the order is filled in as
+        given, so equivalent suffixes are never enumerated.
+    '''
+    N = len(t[1])
+
+    # Case: There aren't alternative assignment orders.
+    if (N < 2):
+        return [t]
+
+    result = []
+    seen_outcomes = set([])
+
+    def extend(prefix, remaining, damage_left):
+        # Case: The outcome of any order beginning with prefix is now fixed.
+        if (damage_left <= 0) or (len(remaining) == 1):
+            order = prefix + remaining
+            outcome = tuple(damage_outcome(t[0].p, order)[order.index(victim)] for victim in t[1])
+            if not(outcome in seen_outcomes):
+                seen_outcomes.add(outcome)
+                result.append((t[0], order))
+            return
+        for i, victim in enumerate(remaining):
+            extend(prefix + [victim],
+                   remaining[:i] + remaining[i + 1:],
+                   damage_left - min(victim.t, damage_left))
+
+    extend([], list(t[1]), t[0].p)
+    return result
+
+
+class DistinctAssignmentOrderSpace(MixedRadixSpace):
+    '''\
+        Random access view of the product of derive_distinct_assignment_orders_() over
+        each group of ibd, i.e., only the assignment orders which differ in outcome.
+    '''
+    def __init__(self, ibd):
+        self.basis = [derive_distinct_assignment_orders_(t) for t in ibd.items()]
+        super().__init__([len(orders) for orders in self.basis])
+
+    def decode(self, digits):
+        return tuple(orders[digit] for (orders, digit) in zip(self.basis, digits))
+
+    def __iter__(self):
+        return product(*self.basis)
+
+
+def assignment_orders(ibd, distinct=False):
+    if distinct:
+        return DistinctAssignmentOrderSpace(ibd)
+    return AssignmentOrderSpace(ibd)
+
+
 # DONE # Logic governing attacker damage assignment order.
 # 703.4i Immediately after blockers have been declared during the declare blockers step,
 # for each attacking creature that’s become blocked by multiple creatures, the active player
 # announces the damage assignment order among the blocking creatures. See rule 509.2
 
-def attacker_damage_assignment_orders(d):
-    return derive_assignment_orders(d)
+def attacker_damage_assignment_orders(d, distinct=False):
+    return assignment_orders(d, distinct)
 
 
 # DONE # Logic governing blocker damage assignment order.
@@ -184,5 +1155,61 @@ def attacker_damage_assignment_orders(d):
 # during the declare blockers step, for each creature that’s blocking multiple creatures, the
 # defending player announces the damage assignment order amongthe attacking creatures.
 # See rule 509.3.
-def blocker_damage_assignment_orders(ibd):
-    return derive_assignment_orders(ibd)
+def blocker_damage_assignment_orders(ibd, distinct=False):
+    return assignment_orders(ibd, distinct)
+
+
+def solve_combat_damage(pieces):
+    '''\
+        Vectorized counterpart of calling Piece.mark_damage_on_victims() on each of pieces.
+        Gathers each source's power and the toughness of each victim in its damage order
+        into arrays, and solves the capped sequential assignment for all of them at once:
+        the cumulative damage dealt to the first j victims of an order is min(p, sum of
+        their toughness), save for the last victim and any Player, which take whatever
+        is left (as in Piece.mark_damage_on_victims()).
+
+        Returns a 5-tuple of the form:
+            [0] list of the sources (Pieces) dealing damage, one per row
+            [1] list of the distinct victims (Pieces or Players)
+            [2] (n_sources, max order length) array of victim indices, -1 where unused
+            [3] (n_sources, max order length) array of the amounts dealt
+            [4] (n_victims,) array of the total amount dealt to each victim
+    '''
+    sources = []
+    damage_orders = []
+    for piece in pieces:
+        # Case: Attacking and not blocked.
+        if (piece.who_i_am_attacking and not(piece.is_blocked)):
+            piece.damage_order = piece.who_i_am_attacking
+        if piece.damage_order:
+            sources.append(piece)
+            damage_orders.append(piece.damage_order)
+
+    n_sources = len(sources)
+    max_order_length = max((len(damage_order) for damage_order in damage_orders), default=0)
+    victims = []
+    victim_idx = {}
+    victim_matrix = np.full((n_sources, max_order_length), -1, dtype=np.int64)
+    toughness_matrix = np.zeros((n_sources, max_order_length), dtype=np.int64)
+    power = np.array([source.p for source in sources], dtype=np.int64)
+
+    for i, damage_order in enumerate(damage_orders):
+        last_victim_i = len(damage_order) - 1
+        for j, victim in enumerate(damage_order):
+            if not(id(victim) in victim_idx):
+                victim_idx[id(victim)] = len(victims)
+                victims.append(victim)
+            victim_matrix[i, j] = victim_idx[id(victim)]
+            # NOTE # The last victim and Players (which have no toughness) are uncapped;
+            #        capping them at p has the same effect.
+            if (j == last_victim_i) or not(hasattr(victim, "t")):
+                toughness_matrix[i, j] = power[i]
+            else:
+                toughness_matrix[i, j] = victim.t
+
+    capped_cumulative_damage = np.minimum(np.cumsum(toughness_matrix, axis=1), power[:, None])
+    amounts = np.diff(capped_cumulative_damage, axis=1, prepend=0)
+    amounts[victim_matrix < 0] = 0
+    used = victim_matrix >= 0
+    totals = np.bincount(victim_matrix[used], weights=amounts[used], minlength=len(victims)).astype(np.int64)
+    return sources, victims, victim_matrix, amounts, totals
@@ -0,0 +1,3 @@
+# NOTE # The modules of this repository are flat and import one another by name
+#        (e.g., `from engine import *`). pytest puts the directory of this rootdir
+#        conftest.py on sys.path, so the tests under tests/ import them the same way.
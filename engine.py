@@ -19,26 +19,36 @@ class TBA(Ability):
         self.tba_name = tba_name.upper()
         super().__init__(**kwargs)
 
-    def __call__(self):
-        print("".join([DEF, '| ', HIG, 'TBA    ', DEF, '| ', self.tba_name]))
+    def __call__(self, environment=None):
+        announce_to(environment, ANNOUNCE_INFO, "TBA", "{}| {}TBA    {}| {}", DEF, HIG, DEF, self.tba_name)
+
+    def iter_target_subscopes_given_actor(self, actor):
+        '''\
+            Streaming counterpart of solve_target_subscopes_given_actor(). Subclasses
+            whose target subscopes are expensive to materialise over-ride this.
+        '''
+        target_subscopes = self.solve_target_subscopes_given_actor(actor)
+        if (target_subscopes is None):
+            return iter([])
+        return iter(target_subscopes)
 
 
 class TBA_PhasingEntailment(Entailment):
     def apply(self, actor, victim):
         # Case: time to phase out
         if not(victim.is_phased_out):
-            actor.environment.announce_event("{} phased out.".format(victim))
+            actor.environment.announce_event("{} phased out.", victim)
             victim.is_phased_out = True
         # Case: time to phase in
         else:
-            actor.environment.announce_event("{} phased in.".format(victim))
+            actor.environment.announce_event("{} phased in.", victim)
             victim.is_phased_out = False
 
 
 class TBA_UntapEntailment(Entailment):
     def apply(self, actor, victim):
-        actor.environment.announce_event("{} untapped {}.".format(actor, victim))
-        actor.environment.announce_event("{} became untapped by {}.".format(victim, actor))
+        actor.environment.announce_event("{} untapped {}.", actor, victim)
+        actor.environment.announce_event("{} became untapped by {}.", victim, actor)
         victim.is_tapped = False
 
 
@@ -59,7 +69,7 @@ class TBA_Phasing(TBA):
                          effect=TBA_PhasingEntailment())
 
     def solve_target_subscopes_given_actor(self, actor):
-        return [list(filter(lambda p: (p.has_phasing), actor.pieces))]
+        return [list(filter(lambda p: (p.has_phasing), actor.controlled_pieces))]
 
 
 class TBA_Untap(TBA):
@@ -75,7 +85,7 @@ class TBA_Untap(TBA):
                          effect=TBA_UntapEntailment())
 
     def solve_target_subscopes_given_actor(self, actor):
-        return [list(filter(lambda p: ((p.can_untap) and (p.is_tapped)), actor.pieces))]
+        return [list(filter(lambda p: ((p.can_untap) and (p.is_tapped)), actor.controlled_pieces))]
 
 
 class TBA_Draw(TBA):
@@ -100,17 +110,17 @@ class TBA_SagaLoreCounters(TBA):
 class TBA_ChooseDefendingOpponentEntailment(Entailment):
     def apply(self, actor, victim):
         actor.is_attacking = victim
-        actor.environment.announce_combat("{} is attacking {}.".format(actor, victim))
+        actor.environment.announce_combat("{} is attacking {}.", actor, victim)
         victim.is_defending_player = True
-        actor.environment.announce_combat("{} is now the defending player.".format(victim))
+        actor.environment.announce_combat("{} is now the defending player.", victim)
         victim.is_being_attacked_by = actor
-        actor.environment.announce_combat("{} is being attacked by {}.".format(victim, actor))
+        actor.environment.announce_combat("{} is being attacked by {}.", victim, actor)
 
 
 class TBA_DeclareAttackersEntailment(Entailment):
     def apply(self, actor, victim):
-        actor.environment.announce_combat("{} has been declared as an attacker.".format(victim[0]))
-        actor.environment.announce_combat("{} is attacking {}.".format(victim[0], victim[1]))
+        actor.environment.announce_combat("{} has been declared as an attacker.", victim[0])
+        actor.environment.announce_combat("{} is attacking {}.", victim[0], victim[1])
         victim[0].who_i_am_attacking = [victim[1]]
 
 
@@ -118,27 +128,27 @@ class TBA_DeclareBlockersEntailment(Entailment):
    def apply(self, actor, victim):
         # NOTE # actor is a blocking Piece
         # NOTE # victim is one of the >= 1 attacking Pieces actor is blocking.
-        actor.environment.announce_combat("{} has been declared as a blocker.".format(actor))
-        actor.environment.announce_combat("{} is blocking {}.".format(actor, victim))
+        actor.environment.announce_combat("{} has been declared as a blocker.", actor)
+        actor.environment.announce_combat("{} is blocking {}.", actor, victim)
         actor.who_i_am_blocking.append(victim)
-        actor.environment.announce_combat("{} is blocked by {}.".format(victim, actor))
+        actor.environment.announce_combat("{} is blocked by {}.", victim, actor)
         victim.pieces_blocking_me.append(actor)
         victim.is_blocked = True
 
 
 class TBA_AttackerDamageOrderEntailment(Entailment):
     def apply(self, actor, victim):
-        actor.environment.announce_combat("{} will assign combat damage in the following order: {}.".format(actor, victim))
+        actor.environment.announce_combat("{} will assign combat damage in the following order: {}.", actor, victim)
         actor.damage_order = victim
 
 class TBA_BlockerDamageOrderEntailment(Entailment):
     def apply(self, actor, victim):
-        actor.environment.announce_combat("{} will assign combat damage in the following order: {}.".format(actor, victim))
+        actor.environment.announce_combat("{} will assign combat damage in the following order: {}.", actor, victim)
         actor.damage_order = victim
 
 class TBA_MaintainLegalHandSizeEntailment(Entailment):
     def apply(self, actor, victim):
-        actor.environment.announce_event("{} discarded {}.".format(actor, victim))
+        actor.environment.announce_event("{} discarded {}.", actor, victim)
 
 
 
@@ -184,25 +194,37 @@ class TBA_DeclareAttackers(TBA):
             Over-ride.
         '''
         attackers = return_attackers(victims)
-        actor.environment.announce_combat("{} declared {} as attackers.".format(actor, attackers))
+        actor.environment.announce_combat("{} declared {} as attackers.", actor, attackers)
         actor.attacker_declaration = victims
         actor.attackers = attackers
         for victim in victims:
             self.effect.apply(actor, victim)
-        self.itsallbeendone = True
+        self.mark_done(actor.environment)
 
     def solve_attackers_given_actor(self, actor):
-        return list(filter(lambda p: (p.can_attack), actor.pieces))
+        return list(filter(lambda p: (p.can_attack), actor.controlled_pieces))
 
     def solve_attackables_given_actor(self, actor):
-        return [actor.is_attacking] + list(filter(lambda p: (p.is_planeswalker), actor.is_attacking.pieces))
+        return [actor.is_attacking] + list(filter(lambda p: (p.is_planeswalker), actor.is_attacking.controlled_pieces))
 
     def solve_target_subscopes_given_actor(self, actor):
         '''\
-            Must return: List[Tuple[Player]]]
+            Must return: Sequence[Tuple[Tuple[Piece, Player]]]
         '''
-        return declare_attackers(attackers=self.solve_attackers_given_actor(actor),
-                                 attackables=self.solve_attackables_given_actor(actor))
+        attackers = self.solve_attackers_given_actor(actor)
+        attackables = self.solve_attackables_given_actor(actor)
+        if actor.environment.canonical_combat:
+            declarations = iter_canonical_attacker_declarations(attackers, attackables)
+        elif (actor.environment.combat_declaration_cache is not None):
+            declarations = cached_declare_attackers(attackers, attackables,
+                                                    cache=actor.environment.combat_declaration_cache) or []
+        else:
+            # NOTE # Restricted to the declarations obeying the most requirements
+            #        without enumerating the rest.
+            return obedient_attacker_declarations(attackers, attackables)
+        return list(filter_maximally_obedient(declarations,
+                                              count_obeyed_attack_requirements,
+                                              max_satisfiable_attack_requirements(attackers, attackables)))
 
 
 
@@ -215,18 +237,36 @@ class TBA_DeclareBlockers(TBA):
                          effect=TBA_DeclareBlockersEntailment())
 
     def solve_blockers_given_actor(self, actor):
-        return list(filter(lambda p: (p.can_block), actor.pieces))
+        return list(filter(lambda p: (p.can_block), actor.controlled_pieces))
 
     def solve_target_subscopes_given_actor(self, actor):
         possible_blockers = self.solve_blockers_given_actor(actor)
         attackers = actor.is_being_attacked_by.attackers
-        return solve_blocker_declarations(A=attackers, B=possible_blockers)
+        if actor.environment.canonical_combat:
+            declarations = iter_canonical_blocker_declarations(A=attackers, B=possible_blockers)
+        elif (actor.environment.combat_declaration_cache is not None):
+            declarations = cached_solve_blocker_declarations(A=attackers, B=possible_blockers,
+                                                             cache=actor.environment.combat_declaration_cache)
+        else:
+            declarations = None
+        # NOTE # The lazy space is restricted to the declarations obeying the most
+        #        requirements without enumerating the rest.
+        if (declarations is None):
+            declarations = obedient_blocker_declarations(attackers, possible_blockers)
+        else:
+            declarations = list(filter_maximally_obedient(declarations,
+                                                          count_obeyed_block_requirements,
+                                                          max_satisfiable_block_requirements(attackers, possible_blockers)))
+        if actor.environment.prune_dominated_blocks:
+            declarations, n_pruned = prune_dominated_blocker_declarations(attackers, declarations)
+            actor.environment.announce_debug("Pruned {} dominated blocker declarations.", n_pruned)
+        return declarations
 
     def apply(self, actor, victims):
         attacking_actor = actor.is_being_attacked_by
         blocking_actor = actor
         blockers = list(victims.keys())
-        blocking_actor.environment.announce_combat("{} declared {} as blockers.".format(blocking_actor, blockers))
+        blocking_actor.environment.announce_combat("{} declared {} as blockers.", blocking_actor, blockers)
         blocking_actor.blocker_declaration = victims
         blocking_actor.inverse_blocker_declaration = invert_blocker_declaration(blocking_actor.blocker_declaration)
         blocking_actor.blockers = blockers
@@ -246,7 +286,8 @@ class TBA_AttackerDamageOrder(TBA):
     def solve_target_subscopes_given_actor(self, actor):
         blocking_actor = actor.is_attacking
         inverted_blocking_declaration = blocking_actor.inverse_blocker_declaration
-        return attacker_damage_assignment_orders(inverted_blocking_declaration)
+        return attacker_damage_assignment_orders(inverted_blocking_declaration,
+                                                 distinct=actor.environment.collapse_damage_orders)
 
     def apply(self, actor, victims):
         actor.attacker_dao = victims
@@ -267,7 +308,8 @@ class TBA_BlockerDamageOrder(TBA):
 
     def solve_target_subscopes_given_actor(self, actor):
         blocking_actor = actor
-        return blocker_damage_assignment_orders(blocking_actor.blocker_declaration)
+        return blocker_damage_assignment_orders(blocking_actor.blocker_declaration,
+                                                distinct=actor.environment.collapse_damage_orders)
 
     def apply(self, actor, victims):
         blocking_actor = actor
@@ -292,8 +334,8 @@ class TBA_BlockerAssignCombatDamage(TBA):
 
 class TBA_CombatDamageDealtEntailment(Entailment):
     def apply(self, actor, victim):
-        actor.environment.announce_combat("{} had victim mark its damage {}.".format(actor, victim))
-        actor.environment.preliminary_damage_events.extend(victim.mark_damage_on_victims())
+        actor.environment.announce_combat("{} had victim mark its damage {}.", actor, victim)
+        actor.environment.damage_buffer.extend(victim.mark_damage_on_victims())
 
 
 class TBA_CombatDamageDealt(TBA):
@@ -304,7 +346,12 @@ class TBA_CombatDamageDealt(TBA):
                          effect=TBA_CombatDamageDealtEntailment())
 
     def apply(self, actor, victims):
-        actor.environment.announce_combat("{} is generating damage subevents.".format(actor))
+        # Case: Anything still buffered belongs to a previous combat; never enact it again.
+        actor.environment.damage_buffer.clear()
+        if actor.environment.vectorized_damage:
+            actor.environment.vectorized_application_of_combat_damage(victims)
+            return
+        actor.environment.announce_combat("{} is generating damage subevents.", actor)
         for victim in victims:
             self.effect.apply(actor, victim)
         actor.environment.process_damage_events()
@@ -323,12 +370,12 @@ class TBA_MaintainLegalHandSize(TBA):
 
     def solve_target_subscopes_given_actor(self, actor):
         n_to_discard = actor.n_to_discard
-        return list(subpowerset(actor.pieces, n=n_to_discard, N=n_to_discard))
+        return list(subpowerset(actor.controlled_pieces, n=n_to_discard, N=n_to_discard))
 
 
 class TBA_RemoveDamageMarkersAndUEoTFXExpireEntailment(Entailment):
     def apply(self, actor, victim):
-        actor.environment.announce_event("Removing all damage marked on {}.".format(victim))
+        actor.environment.announce_event("Removing all damage marked on {}.", victim)
         victim.marked_damage = 0
         victim.touched_by_death = False
 
@@ -348,7 +395,7 @@ class TBA_RemoveDamageMarkersAndUEoTFXExpire(TBA):
 class TBA_EmptyManaPoolEntailment(Entailment):
     def apply(self, actor, victim):
         actor.mana_pool.clear()
-        actor.environment.announce_event("{} empties their mana pool.".format(actor))
+        actor.environment.announce_event("{} empties their mana pool.", actor)
 
 
 class TBA_EmptyManaPool(TBA):
@@ -362,6 +409,70 @@ class TBA_EmptyManaPool(TBA):
         return [(actor,)]
 
 
+###########################
+# Decision Point Stepping #
+###########################
+# NOTE #
+# The core of the engine (Game.iter_loop() -> Turn.iter_loop() -> Epoch.iter_loop() -> ...)
+# is a generator which yields a DecisionPoint whenever a player has to choose, and is
+# sent back the option chosen. drive() answers them with the players' own choices, which
+# is what the synchronous loop() methods do; Game.reset() / Game.step() let an external
+# driver answer them instead, pausing the game for as long as it likes in between.
+class DecisionPoint:
+    '''\
+        A pending choice of a player in a given epoch, among options; either of
+        kind ACTION (what to do with priority, see Player.choose_action()) or of kind
+        OPTION (how to carry out a turn-based action, see Player.choose_option()).
+        Once decided, index holds the index of the option chosen; as the player chose
+        it (see Player.choose_index()), or else as the options rank it.
+    '''
+    ACTION = "action"
+    OPTION = "option"
+    __slots__ = ("player", "options", "epoch", "kind", "index")
+
+    def __init__(self, player, options, epoch, kind):
+        self.player = player
+        self.options = options
+        self.epoch = epoch
+        self.kind = kind
+        self.index = None
+
+    @property
+    def n_options(self):
+        return size_of(self.options)
+
+    def decide(self):
+        '''\
+            Return the option the player chooses of their own accord.
+        '''
+        self.player.chosen_index = None
+        if (self.kind == DecisionPoint.ACTION):
+            option = self.player.choose_action(options=self.options)
+        else:
+            option = self.player.choose_option(options=self.options)
+        self.index = self.player.chosen_index
+        # Case: The player chose without going through Player.choose_index().
+        if (self.index is None):
+            self.index = option_index(self.options, option)
+        return option
+
+    def __repr__(self):
+        return "DecisionPoint({}, {}, {}, n_options={})".format(self.kind, self.player, self.epoch.msg, self.n_options)
+
+
+def drive(decisions):
+    '''\
+        Run a generator of DecisionPoints to completion, answering each one with the
+        choice of its player, and return whatever the generator returns.
+    '''
+    try:
+        decision_point = next(decisions)
+        while True:
+            decision_point = decisions.send(decision_point.decide())
+    except StopIteration as stop:
+        return stop.value
+
+
 class Epoch:
     def __init__(self,
                  game,
@@ -418,54 +529,65 @@ class Epoch:
         self.game.sba()
 
     def grant_priority(self, player, n_passes):
+        drive(self.iter_grant_priority(player, n_passes))
+
+    def iter_grant_priority(self, player, n_passes):
         '''\
-            Give priority to a player.            
+            Give priority to a player, and keep passing it around until both players
+            pass in succession with an empty Stack. Runs as a loop over (player, n_passes)
+            rather than recursing on every action, pass and resolution; yields a
+            DecisionPoint each time a player holds priority.
         '''
-        self.game.announce_debug("Running SBA loop prior to granting priority...")
-        self.sba()
-        self.game.announce_daemon("Granting priority to {}...".format(player))
-        next_action = player.choose_action()
-
-        # Case: Player passed when prompted.
-        if (next_action is None):
-            self.game.announce_debug("{} choose to pass...".format(player))
-
-            # Case: This is the 2nd pass in succession.
-            if n_passes:
-                self.game.announce_debug("This is the 2nd pass in succession!!!")
-                # Case: The Stack is not empty, thus:
-                #           Resolve the topmost object on it; then,
-                #           117.3b: The active player receives priority after a spell or non-mana
-                #           ability resolves.
-                if self.stack:
-                    topmost_object = self.stack.pop()
-                    topmost_object.apply()
-                    self.grant_priority(self.active_player, 0)
-
-                # Case: The Stack is empty, so, end the current epoch. (happens automatically)
+        while True:
+            self.game.announce_debug("Running SBA loop prior to granting priority...")
+            self.sba()
+            self.game.announce_daemon("Granting priority to {}...", player)
+            next_action = yield DecisionPoint(player=player,
+                                              options=player.solve_legals(),
+                                              epoch=self,
+                                              kind=DecisionPoint.ACTION)
+
+            # Case: Player passed when prompted.
+            if (next_action is None):
+                self.game.announce_debug("{} choose to pass...", player)
+
+                # Case: This is the 2nd pass in succession.
+                if n_passes:
+                    self.game.announce_debug("This is the 2nd pass in succession!!!")
+                    # Case: The Stack is not empty, thus:
+                    #           Resolve the topmost object on it; then,
+                    #           117.3b: The active player receives priority after a spell or non-mana
+                    #           ability resolves.
+                    if self.stack:
+                        topmost_object = self.stack.pop()
+                        topmost_object.apply()
+                        (player, n_passes) = (self.active_player, 0)
+
+                    # Case: The Stack is empty, so, end the current epoch.
+                    else:
+                        self.game.announce_debug("Both players passed in succession and the Stack is empty...")
+                        return
+
+                # Case: This is the 1st pass in succession.
+                #       Give the other player a chance to act or pass.
                 else:
-                    self.game.announce_debug("Both players passed in succession and the Stack is empty...")
-
-            # Case: This is the 1st pass in succession.
-            #       Give the other player a chance to act or pass.
+                    other_player = self.other_player(player)
+                    self.game.announce_debug("We think the other player is: {}", other_player)
+                    (player, n_passes) = (other_player, 1)
+
+            # Case: Player did not pass when prompted; however, they chose a special action.
+            #       Therefore, automatically resolve it, and grant them priority again with 0 passes.
+            elif isinstance(next_action.ability, Special):
+                self.game.announce_debug("{} choose a Special non-pass action: {}", player, next_action)
+                next_action.apply()
+                n_passes = 0
+
+            # Case: Player did not pass when prompted; and, they chose an action which uses the Stack.
+            #       Add their input to the Stack and let them hold priority.
             else:
-                other_player = self.other_player(player)
-                self.game.announce_debug("We think the other player is: {}".format(other_player))
-                self.grant_priority(other_player, 1)
-
-        # Case: Player did not pass when prompted; however, they chose a special action.
-        #       Therefore, automatically resolve it, and grant them priority again with 0 passes.
-        elif isinstance(next_action.ability, Special):
-            self.game.announce_debug("{} choose a Special non-pass action: {}".format(player, next_action))
-            next_action.apply()
-            self.grant_priority(player, 0)
-
-        # Case: Player did not pass when prompted; and, they chose an action which uses the Stack.
-        #       Add their input to the Stack and let them hold priority.
-        else:
-            self.game.announce_debug("{} choose a non-pass action: {}".format(player, next_action))
-            self.stack.append(next_action)
-            self.grant_priority(player, 0)
+                self.game.announce_debug("{} choose a non-pass action: {}", player, next_action)
+                self.stack.append(next_action)
+                n_passes = 0
 
     def resolve_topmost_object_on_stack(self):
         if self.stack:
@@ -474,18 +596,21 @@ class Epoch:
             self.grant_priority(self.active_player, 0)
 
     def announce_start_of_epoch(self):
-        self.game.announce_event("Start of {}.".format(self.msg))
+        self.game.announce_event("Start of {}.", self.msg)
 
     def announce_end_of_epoch(self):
-        self.game.announce_event("End of {}.".format(self.msg))
-        tc_buffer()
+        self.game.announce_event("End of {}.", self.msg)
+        tc_buffer(self.game)
 
     def do_tba(self, src_tba):
+        drive(self.iter_tba(src_tba))
+
+    def iter_tba(self, src_tba):
         tbas_to_do = list(src_tba)
         while tbas_to_do:
             tba_to_do = tbas_to_do.pop()
-            tc_buffer()
-            tba_to_do()
+            tc_buffer(self.game)
+            tba_to_do(self.game)
             # Determine the correct actor for this TBA #
             if (tba_to_do.intended_actor == "AP"):
                 which_player = self.active_player
@@ -493,33 +618,48 @@ class Epoch:
                 which_player = self.non_active_player
             tba_to_do_options = self.game.solve_tba_bindings(tba=tba_to_do,
                                                              player=which_player)
-            tba_to_do_option = which_player.choose_option(options=tba_to_do_options)
+            tba_to_do_option = yield DecisionPoint(player=which_player,
+                                                   options=tba_to_do_options,
+                                                   epoch=self,
+                                                   kind=DecisionPoint.OPTION)
             # Case # The option wasn't a pass_binding, which means it can be applied.
             if (tba_to_do_option is not None):
                 tba_to_do_option.apply()
 
     def do_head_tba(self):
+        drive(self.iter_head_tba())
+
+    def iter_head_tba(self):
         self.game.announce_daemon("Enacting turn-based action(s) scheduled for the start of this Epoch...")
-        self.do_tba(self.head_tba)
+        yield from self.iter_tba(self.head_tba)
 
     def do_tail_tba(self):
+        drive(self.iter_tail_tba())
+
+    def iter_tail_tba(self):
         self.game.announce_daemon("Enacting turn-based action(s) scheduled for the end of this Epoch...")
-        self.do_tba(self.tail_tba)
+        yield from self.iter_tba(self.tail_tba)
 
     def determine_skip(self):
         pass
 
     def execute(self):
+        drive(self.iter_execute())
+
+    def iter_execute(self):
         self.announce_start_of_epoch()
-        self.do_head_tba()
+        yield from self.iter_head_tba()
         self.last_nonnull_actor = self.active_player
-        self.grant_priority(self.active_player, 0)
-        self.do_tail_tba()
+        yield from self.iter_grant_priority(self.active_player, 0)
+        yield from self.iter_tail_tba()
         self.announce_end_of_epoch()
         self.determine_skip()
 
     def loop(self):
-        self.execute()
+        drive(self.iter_loop())
+
+    def iter_loop(self):
+        yield from self.iter_execute()
 
 
 class FirstStep(Epoch):
@@ -538,7 +678,7 @@ class FirstStep(Epoch):
             Preface announcement of the start of this epoch with the announcement of
             the start of the phase of which this epoch is the first step.
         '''
-        self.game.announce_event("Start of {} Phase.".format(self.phase_msg))
+        self.game.announce_event("Start of {} Phase.", self.phase_msg)
         super().announce_start_of_epoch()
 
 
@@ -559,7 +699,7 @@ class LastStep(Epoch):
             the end of the phase of which this epoch is the last step.
         '''
         super().announce_end_of_epoch()
-        self.game.announce_event("End of {} Phase.".format(self.phase_msg))
+        self.game.announce_event("End of {} Phase.", self.phase_msg)
 
 
 ###############
@@ -809,12 +949,18 @@ class Turn:
     def handle_start_of_turn(self):
         self.game.announce_event("Start of Turn.")
         self.inject_intended_active_idx()
+        # Pieces have now been controlled continuously since the turn began.
+        for piece in self.game.pieces:
+            piece.controller_changed_this_turn = False
         self.current_epoch = self.first_epoch
 
     def loop(self):
+        drive(self.iter_loop())
+
+    def iter_loop(self):
         self.handle_start_of_turn()
         while not(self.game.gameover):
-            self.current_epoch.loop()
+            yield from self.current_epoch.iter_loop()
             self.current_epoch = self.current_epoch.next_epoch
             if (self.current_epoch is None):
                 self.handle_end_of_turn()
@@ -822,11 +968,89 @@ class Turn:
 
 
 
+class AbilityIndex:
+    '''\
+        Index of the (piece, ability) pairs of a Game by the conditions verify_ability()
+        checks, so that solving a player's active abilities only looks at candidates:
+            key   : (owner, zone, epoch name, must be actor's turn, stack depth bucket)
+            value : dictionary of piece -> list of (position in ability_list, ability)
+        where the stack depth bucket is 0 for abilities which need an empty stack and
+        1 otherwise. Only abilities active in the piece's current zone are indexed; a
+        piece is re-indexed whenever it changes zone, owner or controller, or its
+        ability_list is assigned.
+    '''
+    def __init__(self):
+        self.entries = defdict(dict)
+        self.keys_by_piece = dict()
+        # piece -> (owner, zone) it was indexed under.
+        self.zone_by_piece = dict()
+        self.zones_by_owner = defdict(lambda: defdict(int))
+        self.piece_order = dict()
+
+    def add_piece(self, piece):
+        if not(piece in self.piece_order):
+            self.piece_order[piece] = len(self.piece_order)
+        keys = []
+        for position, ability in enumerate(piece.ability_list):
+            if (piece.current_zone in ability.active_zones):
+                stack_depth_bucket = int(ability.max_stack_size > 0)
+                for epoch_name in ability.active_epoch_names:
+                    key = (piece.owner, piece.current_zone, epoch_name, ability.must_be_actors_turn, stack_depth_bucket)
+                    self.entries[key].setdefault(piece, []).append((position, ability))
+                    keys.append(key)
+        self.keys_by_piece[piece] = keys
+        self.zone_by_piece[piece] = (piece.owner, piece.current_zone)
+        self.zones_by_owner[piece.owner][piece.current_zone] += 1
+
+    def remove_piece(self, piece):
+        for key in self.keys_by_piece.pop(piece, []):
+            self.entries[key].pop(piece, None)
+        # Case: The piece was indexed; forget the owner and zone it was indexed under.
+        if (piece in self.zone_by_piece):
+            owner, zone = self.zone_by_piece.pop(piece)
+            zone_counts = self.zones_by_owner[owner]
+            zone_counts[zone] -= 1
+            if not(zone_counts[zone]):
+                del zone_counts[zone]
+
+    def reindex_piece(self, piece):
+        self.remove_piece(piece)
+        self.add_piece(piece)
+
+    def solve_active_abilities(self, player):
+        '''\
+            Return the abilities of player's pieces which verify_ability() would accept
+            right now, in the order Player.pieces would have yielded them.
+        '''
+        game = player.environment
+        epoch_name = game.current_epoch.msg
+        stack_depth = len(game.stack)
+        is_active = player is game.active_player
+        stack_depth_buckets = (0, 1) if (stack_depth == 0) else (1,)
+        turn_timings = (False, True) if is_active else (False,)
+
+        candidates = []
+        for zone in self.zones_by_owner[player]:
+            for must_be_actors_turn in turn_timings:
+                for stack_depth_bucket in stack_depth_buckets:
+                    key = (player, zone, epoch_name, must_be_actors_turn, stack_depth_bucket)
+                    for piece, abilities in self.entries.get(key, {}).items():
+                        for (position, ability) in abilities:
+                            if (stack_depth <= ability.max_stack_size):
+                                candidates.append((self.piece_order[piece], position, ability))
+        candidates.sort(key=lambda candidate: candidate[:2])
+        return [ability for (_, _, ability) in candidates]
+
+
 class Game:
     def __init__(self, players, pieces):
         self.players = list(players)
         self.pieces = list(pieces)
         self.zones = self.generate_zones()
+        # Ticked by every mutation of this Game's state which bears on legality.
+        self.mutation_clock = MutationClock()
+        # (TargetData, actor) -> (mutation_clock.version, target subscopes); see TargetData.
+        self.interned_subscopes = {}
         self.registration()
         self.gameover = False
         self.current_turn = None
@@ -834,31 +1058,128 @@ class Game:
         self.n_extra_turns = 0
         self.stack = []
         self.limbo = []
-        self.preliminary_damage_events = []
+        self.damage_buffer = DamageEventBuffer()
+        self.damage_batch = []
+        self.damage_replacement_hooks = []
         self.preliminary_sba_events = []
+        # COMBAT ENUMERATION OPTIONS #
+        # Offer one representative per class of declarations of interchangeable Pieces.
+        self.canonical_combat = False
+        # Offer only damage assignment orders which differ in outcome.
+        self.collapse_damage_orders = True
+        # Drop blocker declarations which are statically dominated by another.
+        self.prune_dominated_blocks = False
+        # Memoize materialised declarations in this LRUCache (e.g., COMBAT_DECLARATION_CACHE)
+        # instead of offering lazy declaration spaces.
+        self.combat_declaration_cache = None
+        # Resolve combat damage in bulk over NumPy arrays.
+        self.vectorized_damage = False
+        # Where announcements go (see AnnouncementSink); e.g., NullSink() to run headless.
+        self.sink = TerminalSink()
+        # Generator driven by reset() / step(), and the DecisionPoint it is paused at.
+        self.decisions = None
+        self.decision_point = None
+        # LEGAL MOVE CACHE #
+        # Bindings offered by solve_legals(), keyed by (player, epoch, stack depth, version
+        # of mutation_clock); set to None to solve them from scratch every time.
+        self.legal_move_cache = LRUCache(maxsize=64)
 
     def simultaneous_application_of_damage_events(self):
-        # TODO #
-        for damage_subevent in self.preliminary_damage_events:
+        '''\
+            Enact the processed batch of damage subevents in a single pass, then reset
+            the damage buffer and batch for the next combat damage step.
+        '''
+        for damage_subevent in self.damage_batch:
             damage_subevent.enact()
+        self.damage_batch = []
+        self.damage_buffer.clear()
+
 
+    def vectorized_application_of_combat_damage(self, pieces):
+        '''\
+            Solve the combat damage dealt by pieces in bulk (see solve_combat_damage) and
+            apply the totals to each victim simultaneously. DamageSubEvents are only built
+            (and enacted, so as to be announced) when logging.
+        '''
+        sources, victims, victim_matrix, amounts, totals = solve_combat_damage(pieces)
+        # Case: Someone needs to see the individual subevents; go through the damage buffer.
+        if self.logging or self.damage_replacement_hooks:
+            for i, source in enumerate(sources):
+                for j in range(victim_matrix.shape[1]):
+                    if (victim_matrix[i, j] >= 0):
+                        victim = victims[victim_matrix[i, j]]
+                        self.damage_buffer.add(actor=source, victim=victim, amount=int(amounts[i, j]))
+            self.process_damage_events()
+            self.simultaneous_application_of_damage_events()
+            return
+        for victim, total in zip(victims, totals.tolist()):
+            if isinstance(victim, Player):
+                victim.stats.hp -= total
+            else:
+                victim.marked_damage += total
 
     def process_damage_events(self):
-        # TODO #
-        pass
+        '''\
+            Aggregate the buffered damage subevents per (source, victim) and run the
+            replacement / prevention hooks over the aggregated batch. Each hook takes and
+            returns a list of DamageSubEvents.
+        '''
+        damage_batch = self.damage_buffer.aggregate()
+        for damage_replacement_hook in self.damage_replacement_hooks:
+            damage_batch = damage_replacement_hook(damage_batch)
+        self.damage_batch = damage_batch
 
     def generate_zones(self):
         # TODO #
         return []
 
     def registration(self):
+        self.ability_index = AbilityIndex()
+        self.pieces_by_owner = defdict(list)
+        self.pieces_by_controller = defdict(list)
         for player in self.players:
             player.environment = self
         for piece in self.pieces:
             piece.environment = self
+            self.ability_index.add_piece(piece)
+            self.pieces_by_owner[piece.owner].append(piece)
+            self.pieces_by_controller[piece.effective_controller].append(piece)
+        self.target_index = TargetIndex(self.players, self.pieces)
         for zone in self.zones:
             zone.environment = self
 
+    def reindex_piece(self, piece):
+        '''\
+            Called by a registered piece which changed zone or had its abilities changed.
+        '''
+        self.ability_index.reindex_piece(piece)
+
+    def piece_controller_changed(self, piece, previous_controller):
+        '''\
+            Called by a registered piece whose (effective) controller changed.
+        '''
+        self.pieces_by_controller[previous_controller].remove(piece)
+        self.pieces_by_controller[piece.effective_controller].append(piece)
+        self.ability_index.reindex_piece(piece)
+
+    def piece_owner_changed(self, piece, previous_owner, previous_controller):
+        '''\
+            Called by a registered piece whose owner changed; its effective controller
+            changes along with it unless control of it had changed hands.
+        '''
+        self.pieces_by_owner[previous_owner].remove(piece)
+        self.pieces_by_owner[piece.owner].append(piece)
+        if not(piece.effective_controller is previous_controller):
+            self.pieces_by_controller[previous_controller].remove(piece)
+            self.pieces_by_controller[piece.effective_controller].append(piece)
+        self.ability_index.reindex_piece(piece)
+
+    def pieces_owned_by(self, player):
+        return tuple(self.pieces_by_owner[player])
+
+    def pieces_controlled_by(self, player):
+        return tuple(self.pieces_by_controller[player])
+
     @property
     def no_attackers(self):
         # TODO # Actually implement something like this.
@@ -890,24 +1211,38 @@ class Game:
         self.stack = []
         self.limbo = []
 
-    def _announce(self, prefix_color, prefix, announcement_color, announcement):
-        true_prefix = "{}{}{}".format(prefix_color, prefix, DEF)
-        true_prefix = true_prefix.center(10)
-        prefix = "| " + true_prefix + " |"
-        suffix = " {}{}{}".format(announcement_color, announcement, DEF)
-        print("".join([prefix, suffix]))
+    def announce(self, level, category, fmt, *args):
+        '''\
+            Hand an announcement to the sink; fmt.format(*args) is left to the sink, and
+            skipped altogether when it filters the level or category out.
+        '''
+        sink = self.sink
+        if sink.enabled(level, category):
+            sink.emit(level, category, fmt, args)
 
-    def announce_event(self, announcement):
-        self._announce(prefix_color=HIW, prefix="EVENT ", announcement_color=DEF, announcement=announcement)
+    def announce_event(self, fmt, *args):
+        self.announce(ANNOUNCE_INFO, "EVENT", fmt, *args)
 
-    def announce_daemon(self, announcement):
-        self._announce(prefix_color=CYN, prefix="ENGINE", announcement_color=DEF, announcement=announcement)
+    def announce_daemon(self, fmt, *args):
+        self.announce(ANNOUNCE_ENGINE, "ENGINE", fmt, *args)
 
-    def announce_debug(self, a):
-        self._announce(prefix_color=MAG, prefix="DEBUG ", announcement_color=DEF, announcement=a)
+    def announce_debug(self, fmt, *args):
+        self.announce(ANNOUNCE_DEBUG, "DEBUG", fmt, *args)
 
-    def announce_combat(self, a):
-        self._announce(prefix_color=RED, prefix="COMBAT", announcement_color=DEF, announcement=a)
+    def announce_combat(self, fmt, *args):
+        self.announce(ANNOUNCE_INFO, "COMBAT", fmt, *args)
+
+    @property
+    def logging(self):
+        '''\
+            Whether anyone is reading the combat announcements (DamageSubEvents are only
+            built if so); setting it swaps in a TerminalSink or a NullSink.
+        '''
+        return self.sink.enabled(ANNOUNCE_INFO, "COMBAT")
+
+    @logging.setter
+    def logging(self, value):
+        self.sink = TerminalSink() if value else NullSink()
 
     def upload_triggered_abilities(self):
         '''\
@@ -929,23 +1264,28 @@ class Game:
         self.end_game()
 
     def sba(self):
+        '''\
+            Check state based actions (then triggered abilities) repeatedly until none
+            are required to take place, or the game ends.
+        '''
         # Case: Game hasn't ended yet.
-        if not(self.gameover):
+        while not(self.gameover):
             self.announce_daemon("Checking state based actions...")
 
             # Case: SBA is required to take place.
             if self.sba_check_hp():
                 self.sba_check_hp_event()
-                self.sba()
 
             # Case: No SBA required to take place, time to check triggered abilities...
             elif self.limbo:
                 self.upload_triggered_abilities()
-                self.sba()
+
+            # Case: Nothing left to do.
+            else:
+                return
 
         # Case: Game is over.
-        else:
-            print("DEBUG: sba() called and found the game is already over.")
+        self.announce_debug("sba() called and found the game is already over.")
 
     def new_turn_same_active_player(self):
         return Turn(game=self, intended_active_idx=self.active_idx)
@@ -969,17 +1309,66 @@ class Game:
                 bindings.append(Binding(actor=player, ability=ability, target_subscope=target_subscope))
         return bindings
 
+    def solve_legal_actions(self, player):
+        '''\
+            Return the same Bindings as solve_affordance_bindings() as a lazy
+            LegalActionSequence; no Binding is built until it is indexed or iterated over.
+        '''
+        binding_sequences = [BindingSequence(actor=player, ability=ability,
+                                             target_subscopes=ability.solve_target_subscopes_given_actor(player))
+                             for ability in player.abilities]
+        return LegalActionSequence(actor=player, pass_binding=player.pass_binding, binding_sequences=binding_sequences)
+
+    def iter_tba_bindings(self, tba, player):
+        '''\
+            Lazily generate the Bindings of a TBA for a given player without
+            materialising its target subscopes.
+        '''
+        for target_subscope in tba.iter_target_subscopes_given_actor(player):
+            yield Binding(actor=player, ability=tba, target_subscope=target_subscope)
+
     def solve_tba_bindings(self, tba, player):
-        bindings = []
+        '''\
+            Return a lazy sequence of the Bindings of a TBA for a given player; no
+            Binding is built until it is indexed, iterated over or sampled.
+        '''
         target_subscopes = tba.solve_target_subscopes_given_actor(player)
-        for target_subscope in target_subscopes:
-            bindings.append(Binding(actor=player, ability=tba, target_subscope=target_subscope))
+        if target_subscopes:
+            return BindingSequence(actor=player, ability=tba, target_subscopes=target_subscopes)
+        return [player.pass_binding]
+
+    def take_tba_bindings(self, tba, player, k):
+        '''\
+            Return (at most) the first k Bindings of a TBA for a given player.
+        '''
+        bindings = take(self.iter_tba_bindings(tba, player), k)
+        if bindings:
+            return bindings
+        return [player.pass_binding]
+
+    def sample_tba_bindings(self, tba, player, k):
+        '''\
+            Return a uniform sample of (at most) k Bindings of a TBA for a given
+            player in a single streaming pass.
+        '''
+        bindings = reservoir_sample(self.iter_tba_bindings(tba, player), k)
         if bindings:
             return bindings
         return [player.pass_binding]
 
     def solve_legals(self, player):
-        return self.solve_affordance_bindings(player)
+        '''\
+            Return the LegalActionSequence player may choose from; reused from the legal move cache
+            until the epoch or the stack depth changes, or the state is mutated.
+        '''
+        if (self.legal_move_cache is None):
+            return self.solve_legal_actions(player)
+        key = (player, self.current_epoch, len(self.stack), self.mutation_clock.version)
+        legal_actions = self.legal_move_cache.get(key)
+        if (legal_actions is None):
+            legal_actions = self.solve_legal_actions(player)
+            self.legal_move_cache.put(key, legal_actions)
+        return legal_actions
 
     def determine_current_turn(self):
         '''\
@@ -994,19 +1383,52 @@ class Game:
         return self.new_turn_swap_active_player()
 
     def loop(self):
+        drive(self.iter_loop())
+
+    def iter_loop(self):
         self.start_game()
         n_turns = 0
         max_n_turns = 1
         while not(self.gameover):
             if (n_turns <= max_n_turns):
                 self.current_turn = self.determine_current_turn()
-                self.current_turn.loop()
+                yield from self.current_turn.iter_loop()
                 n_turns += 1
             else:
                 break
         self.announce_debug("Maximum N Turns Reached.")
         self.end_game()
 
+    ######################
+    # Stepping Interface #
+    ######################
+    def reset(self):
+        '''\
+            Start the game under an external driver rather than the players' own
+            choices; return the first DecisionPoint (None if the game ends without one).
+        '''
+        self.decisions = self.iter_loop()
+        self.decision_point = None
+        return self.resume(None)
 
-G = Game(players=PLAYERS, pieces=PIECES+pp0_pieces+pp1_pieces)
-G.loop()
+    def step(self, choice):
+        '''\
+            Answer the pending DecisionPoint with the option at index choice of its
+            options; return the next DecisionPoint (None once the game is over).
+        '''
+        if (self.decision_point is None):
+            raise ValueError("Game.step() called without a pending decision point; call Game.reset() first.")
+        return self.resume(self.decision_point.options[choice])
+
+    def resume(self, option):
+        try:
+            self.decision_point = self.decisions.send(option)
+        except StopIteration:
+            self.decision_point = None
+            self.decisions = None
+        return self.decision_point
+
+
+if __name__ == "__main__":
+    G = Game(players=PLAYERS, pieces=PIECES+pp0_pieces+pp1_pieces)
+    G.loop()
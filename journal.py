@@ -0,0 +1,154 @@
+from engine import *
+import struct
+import zlib
+
+
+##########################################
+# Binary Decision Journal and Its Replay #
+##########################################
+# NOTE #
+# The engine itself draws no random numbers; everything that varies from one game to
+# the next is a choice at some DecisionPoint. A journal is therefore just the seed the
+# players' RNG (np.random) was given, followed by the index of the option chosen at each
+# decision point, each written as an unsigned LEB128 varint (one byte below 128), with
+# a CRC-32 of the state after every checksum_interval-th decision (if non-zero):
+#   [header: magic, seed, checksum_interval][index]...[index][checksum][index]...
+# Replay answers the decision points straight from the journal; so any side effect of
+# a player's choosing (e.g., ManualChoiceMixin marking the chosen ability as done) is
+# not reproduced, and would show up as a checksum mismatch.
+
+JOURNAL_MAGIC = b"ENGJNL\x00\x01"
+JOURNAL_HEADER = struct.Struct("<8sQI")
+JOURNAL_CHECKSUM = struct.Struct("<I")
+
+
+class JournalMismatch(Exception):
+    pass
+
+
+def state_checksum(game):
+    '''\
+        Return a CRC-32 of the parts of the state of game which decisions can change.
+    '''
+    state = (game.active_idx,
+             len(game.stack),
+             tuple(player.stats.hp for player in game.players),
+             tuple((piece.current_zone, piece.is_tapped, piece.is_phased_out, piece.marked_damage,
+                    piece.touched_by_death, piece.is_attacking, piece.is_blocking)
+                   for piece in game.pieces))
+    return zlib.crc32(repr(state).encode())
+
+
+def write_varint(buffer, value):
+    while (value >= 0x80):
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, position):
+    '''\
+        Return a 2-tuple of the form (value, position just past it).
+    '''
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if not(byte & 0x80):
+            return value, position
+        shift += 7
+
+
+class Journal:
+    def __init__(self, seed, checksum_interval=0, choices=None, checksums=None):
+        self.seed = seed
+        self.checksum_interval = checksum_interval
+        self.choices = list(choices) if (choices is not None) else []
+        self.checksums = list(checksums) if (checksums is not None) else []
+
+    def append(self, index, game):
+        self.choices.append(index)
+        if self.checksum_interval and not(len(self.choices) % self.checksum_interval):
+            self.checksums.append(state_checksum(game))
+
+    def to_bytes(self):
+        buffer = bytearray(JOURNAL_HEADER.pack(JOURNAL_MAGIC, self.seed, self.checksum_interval))
+        checksums = iter(self.checksums)
+        for n, index in enumerate(self.choices, 1):
+            write_varint(buffer, index)
+            if self.checksum_interval and not(n % self.checksum_interval):
+                buffer += JOURNAL_CHECKSUM.pack(next(checksums))
+        return bytes(buffer)
+
+    @classmethod
+    def from_bytes(cls, data):
+        (magic, seed, checksum_interval) = JOURNAL_HEADER.unpack_from(data, 0)
+        if (magic != JOURNAL_MAGIC):
+            raise ValueError("Not a decision journal.")
+        journal = cls(seed, checksum_interval)
+        position = JOURNAL_HEADER.size
+        while (position < len(data)):
+            (index, position) = read_varint(data, position)
+            journal.choices.append(index)
+            if checksum_interval and not(len(journal.choices) % checksum_interval):
+                journal.checksums.append(JOURNAL_CHECKSUM.unpack_from(data, position)[0])
+                position += JOURNAL_CHECKSUM.size
+        return journal
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    def __len__(self):
+        return len(self.choices)
+
+    def __repr__(self):
+        return "Journal(seed={}, n_choices={}, n_checksums={})".format(self.seed, len(self.choices), len(self.checksums))
+
+
+def record(game, seed, checksum_interval=0):
+    '''\
+        Seed np.random with seed, then play game to the end with its players' own
+        choices, exactly as Game.loop() would; return the Journal of the game.
+    '''
+    np.random.seed(seed)
+    journal = Journal(seed, checksum_interval)
+    decision_point = game.reset()
+    while (decision_point is not None):
+        option = decision_point.decide()
+        index = decision_point.index
+        decision_point = game.resume(option)
+        journal.append(index, game)
+    return journal
+
+
+def replay(game, journal, verify=True):
+    '''\
+        Play a fresh game (set up as the recorded one was) through the choices of
+        journal, with announcements off and without consulting its players; raise
+        JournalMismatch if a checksum differs (when verify) or the game does not end
+        exactly when the journal does. Return the game.
+    '''
+    game.sink = NullSink()
+    np.random.seed(journal.seed)
+    checksums = iter(journal.checksums)
+    decision_point = game.reset()
+    for n, index in enumerate(journal.choices, 1):
+        if (decision_point is None):
+            raise JournalMismatch("The game ended after {} of the {} decisions journaled.".format(n - 1, len(journal)))
+        if not(0 <= index < decision_point.n_options):
+            raise JournalMismatch("Decision {} chose option {} of only {}.".format(n, index, decision_point.n_options))
+        decision_point = game.step(index)
+        if verify and journal.checksum_interval and not(n % journal.checksum_interval):
+            if (state_checksum(game) != next(checksums)):
+                raise JournalMismatch("State checksum mismatch after decision {}.".format(n))
+    if (decision_point is not None):
+        raise JournalMismatch("The journal ended before the game did.")
+    return game
@@ -2,6 +2,8 @@ from abilities_and_fx import *
 
 
 class DamageSubEvent:
+    __slots__ = ("actor", "victim", "amount")
+
     def __init__(self, actor, victim, amount):
         self.actor = actor
         self.victim = victim
@@ -16,19 +18,69 @@ class DamageSubEvent:
         # Case: The victim is a Piece; mark damage accordingly.
         else:
             self.victim.marked_damage += self.amount
-        self.actor.environment.announce_combat("{} dealt {} damage to {}!".format(self.actor, self.amount, self.victim))
+        self.actor.environment.announce_combat("{} dealt {} damage to {}!", self.actor, self.amount, self.victim)
 
     def __repr__(self):
         return "damage({}, {}, {})".format(self.actor, self.victim, self.amount)
 
 
+class DamageEventBufferOverflow(Exception):
+    pass
+
+
+class DamageEventBuffer:
+    '''\
+        Per-combat staging area for the damage subevents which are to be applied
+        simultaneously. Its list is reused from one combat damage step to the next;
+        clear() must be called once the batch has been applied. Holds at most capacity
+        subevents, raising DamageEventBufferOverflow rather than growing past it; a
+        single combat stages one per (source, victim in its damage order), so running
+        out means the buffer was not cleared between combats.
+    '''
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.events = []
+
+    def reserve(self, n):
+        if (len(self.events) + n > self.capacity):
+            raise DamageEventBufferOverflow("Staging {} more damage subevents would exceed the capacity of {} ({} staged)."
+                                            .format(n, self.capacity, len(self.events)))
+
+    def add(self, actor, victim, amount):
+        self.reserve(1)
+        self.events.append(DamageSubEvent(actor=actor, victim=victim, amount=amount))
+
+    def extend(self, damage_subevents):
+        damage_subevents = list(damage_subevents)
+        self.reserve(len(damage_subevents))
+        self.events.extend(damage_subevents)
+
+    def aggregate(self):
+        '''\
+            Return one DamageSubEvent per (actor, victim) pair, with the amounts of all
+            the buffered subevents for that pair summed, in order of first appearance.
+        '''
+        amounts = {}
+        for damage_subevent in self.events:
+            key = (damage_subevent.actor, damage_subevent.victim)
+            amounts[key] = amounts.get(key, 0) + damage_subevent.amount
+        return [DamageSubEvent(actor=actor, victim=victim, amount=amount)
+                for ((actor, victim), amount) in amounts.items()]
+
+    def clear(self):
+        self.events.clear()
+
+    def __len__(self):
+        return len(self.events)
+
+
 class Piece:
     def __init__(self, owner, debug_name, p, t, ability_list=[], charx_dict={}):
-        self.owner = owner
+        self.environment = None
+        self._owner = owner
         self.debug_name = debug_name
         self.ability_list = list(ability_list)
         self.current_zone = 0
-        self.environment = None
 
         ##################################
         # NOTE # Kludge for DamageDaemon #
@@ -67,7 +119,7 @@ class Piece:
         self.is_creature = True
         self.is_planeswalker = False
         ##################################
-        self.controller = None
+        self._controller = None
         self.controller_changed_this_turn = False
         self.controller_when_i_phased_out = None
         ##################################
@@ -91,6 +143,30 @@ class Piece:
             setattr(self, charx, charx_dict[charx])
 
 
+    @property
+    def current_zone(self):
+        return self._current_zone
+
+    @current_zone.setter
+    def current_zone(self, value):
+        self._current_zone = value
+        tick_mutation_clock(self.environment)
+        if (self.environment is not None):
+            self.environment.reindex_piece(self)
+
+    @property
+    def ability_list(self):
+        # NOTE # Assign a new list rather than mutating this one in place, or else
+        #        the environment's AbilityIndex will not hear about it.
+        return self._ability_list
+
+    @ability_list.setter
+    def ability_list(self, value):
+        self._ability_list = value
+        tick_mutation_clock(self.environment)
+        if (self.environment is not None):
+            self.environment.reindex_piece(self)
+
     @property
     def abilities(self):
         return (ability for ability in self.ability_list if verify_ability(self, ability))
@@ -99,6 +175,62 @@ class Piece:
     def abilities(self, value):
         self.ability_list = list(value)
 
+    @property
+    def owner(self):
+        return self._owner
+
+    @owner.setter
+    def owner(self, value):
+        previous_owner, previous_controller = self._owner, self.effective_controller
+        self._owner = value
+        tick_mutation_clock(self.environment)
+        if (self.environment is not None) and not(value is previous_owner):
+            self.environment.piece_owner_changed(self, previous_owner, previous_controller)
+
+    @property
+    def controller(self):
+        return self._controller
+
+    @controller.setter
+    def controller(self, value):
+        previous_controller = self.effective_controller
+        self._controller = value
+        tick_mutation_clock(self.environment)
+        # Case: Control actually changed hands.
+        if not(self.effective_controller is previous_controller):
+            self.controller_changed_this_turn = True
+            if (self.environment is not None):
+                self.environment.piece_controller_changed(self, previous_controller)
+
+    @property
+    def is_tapped(self):
+        return self._is_tapped
+
+    @is_tapped.setter
+    def is_tapped(self, value):
+        if (getattr(self, "_is_tapped", None) != value):
+            tick_mutation_clock(self.environment)
+        self._is_tapped = value
+
+    @property
+    def is_phased_out(self):
+        return self._is_phased_out
+
+    @is_phased_out.setter
+    def is_phased_out(self, value):
+        if (getattr(self, "_is_phased_out", None) != value):
+            tick_mutation_clock(self.environment)
+        self._is_phased_out = value
+
+    @property
+    def effective_controller(self):
+        '''\
+            The controller of this piece, defaulting to its owner until control changes.
+        '''
+        if (self._controller is None):
+            return self.owner
+        return self._controller
+
     @property
     def has_summoning_sickness(self):
         if self.is_creature:
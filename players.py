@@ -14,6 +14,8 @@ class Player:
         self._abilities = None
         self.pass_binding = None
         self.environment = None
+        # Index of the last option chosen by index (see choose_index), for DecisionPoint.
+        self.chosen_index = None
         self.n_lands_played_this_turn = 0
         # COMBAT #
         self.attacker_declaration = list([])
@@ -63,9 +65,14 @@ class Player:
 
     @property
     def pieces(self):
-        # TODO #
         if (self.environment is not None):
-            return (piece for piece in self.environment.pieces if (piece.owner is self))
+            return self.environment.pieces_owned_by(self)
+        raise ValueError("Player asked for its pieces without being embedded in an environment.")
+
+    @property
+    def controlled_pieces(self):
+        if (self.environment is not None):
+            return self.environment.pieces_controlled_by(self)
         raise ValueError("Player asked for its pieces without being embedded in an environment.")
 
     @pieces.setter
@@ -74,6 +81,8 @@ class Player:
 
     @property
     def abilities(self):
+        if (self.environment is not None):
+            return self.environment.ability_index.solve_active_abilities(self)
         result = []
         for piece in self.pieces:
             result.extend(piece.abilities)
@@ -82,16 +91,30 @@ class Player:
     def solve_legals(self):
         return self.environment.solve_legals(player=self)
 
-    def choose_action(self):
-        return random_choice(self.solve_legals())
+    def choose_index(self, options):
+        '''\
+            Return the index of the option to choose; only the chosen one gets built
+            when options is lazy (e.g., a LegalActionSequence or a BindingSequence).
+        '''
+        self.chosen_index = random_below(size_of(options))
+        return self.chosen_index
+
+    def choose_action(self, options=None):
+        if (options is None):
+            options = self.solve_legals()
+        return options[self.choose_index(options)]
+
+    def choose_option(self, options):
+        return options[self.choose_index(options)]
 
     def __repr__(self):
         return "{}Player {}{}".format(TEAM_COLORS[self.team_id], self.debug_name, DEF)
 
 
 class ManualChoiceMixin:
-    def choose_action(self):
-        options = self.solve_legals()
+    def choose_action(self, options=None):
+        if (options is None):
+            options = self.solve_legals()
         while True:
             for i, option in enumerate(options):
                 print("{}\t{}".format(i, option))
@@ -100,7 +123,8 @@ class ManualChoiceMixin:
                 result_int = int(result)
                 option = options[result_int]
                 if not(option is self.pass_binding):
-                    option.ability.itsallbeendone = True
+                    option.ability.mark_done(self.environment)
+                self.chosen_index = result_int if (result_int >= 0) else (result_int + size_of(options))
                 break
             except:
                 continue
@@ -117,7 +141,8 @@ class ManualChoiceMixin:
                 result_int = int(result)
                 option = options[result_int]
                 if not(option is self.pass_binding):
-                    option.ability.itsallbeendone = True
+                    option.ability.mark_done(self.environment)
+                self.chosen_index = result_int if (result_int >= 0) else (result_int + size_of(options))
                 break
             except:
                 continue
@@ -0,0 +1,267 @@
+from target import *
+from combat import *
+import time
+
+
+###################################################
+# Alpha-Beta Search Over the Combat Decision Tree #
+###################################################
+# NOTE #
+# The combat phase is searched as a game of four plies played on a snapshot of the
+# board, without touching any Piece or Player:
+#   [1] max: the attacking player declares attackers     (TBA_DeclareAttackers)
+#   [2] min: the defending player declares blockers      (TBA_DeclareBlockers)
+#   [3] max: the attacking player orders blockers        (TBA_AttackerDamageOrder)
+#   [4] min: the defending player orders attackers       (TBA_BlockerDamageOrder)
+# and combat damage (TBA_CombatDamageDealt) is resolved at the leaves following
+# Piece.mark_damage_on_victims(). Values are from the attacking player's point of view.
+# Declarations are enumerated up to interchangeable pieces and damage orders up to
+# equivalent outcomes, since neither affects the value of a leaf.
+
+
+class SearchBudgetExhausted(Exception):
+    pass
+
+
+class CombatEvaluation:
+    '''\
+        Configurable leaf evaluation from the attacking player's point of view: the
+        weighted sum of the damage dealt to the attackables, plus the weighted material
+        (p + t) of the defending pieces killed, minus that of the attacking pieces killed.
+    '''
+    def __init__(self, life_weight=1, material_weight=1):
+        self.life_weight = life_weight
+        self.material_weight = material_weight
+
+    def piece_value(self, piece):
+        return piece.p + piece.t
+
+    def __call__(self, damage_to_attackables, attackers_killed, blockers_killed):
+        value = self.life_weight * sum(damage_to_attackables.values())
+        value += self.material_weight * sum(self.piece_value(blocker) for blocker in blockers_killed)
+        value -= self.material_weight * sum(self.piece_value(attacker) for attacker in attackers_killed)
+        return value
+
+
+class CombatSolution:
+    def __init__(self, declaration, value, n_nodes, complete):
+        self.declaration = declaration
+        self.value = value
+        self.n_nodes = n_nodes
+        self.complete = complete
+
+    def __repr__(self):
+        return "CombatSolution(value={}, n_nodes={}, complete={}, declaration={})".format(self.value, self.n_nodes, self.complete, self.declaration)
+
+
+class CombatSolver:
+    '''\
+        Alpha-beta search over declare attackers -> declare blockers -> damage orders ->
+        combat damage, with move ordering by power on the attack / let through, and a budget of
+        max_nodes nodes and/or max_seconds seconds. Once the budget is exhausted, the
+        best move among those fully searched at the root is returned (complete=False).
+    '''
+    def __init__(self, evaluation=None, max_nodes=20000, max_seconds=None):
+        self.evaluation = evaluation if (evaluation is not None) else CombatEvaluation()
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self.n_nodes = 0
+        self.deadline = None
+
+    def reset_budget(self):
+        self.n_nodes = 0
+        self.deadline = None
+        if (self.max_seconds is not None):
+            self.deadline = time.perf_counter() + self.max_seconds
+
+    def visit(self):
+        self.n_nodes += 1
+        if (self.max_nodes is not None) and (self.n_nodes > self.max_nodes):
+            raise SearchBudgetExhausted()
+        if (self.deadline is not None) and not(self.n_nodes & 0xff):
+            if (time.perf_counter() > self.deadline):
+                raise SearchBudgetExhausted()
+
+    ###################
+    # Move Generation #
+    ###################
+    def attack_moves(self, attackers, attackables):
+        maximum = max_satisfiable_attack_requirements(attackers, attackables)
+        declarations = filter_maximally_obedient(iter_canonical_attacker_declarations(attackers, attackables),
+                                                 count_obeyed_attack_requirements,
+                                                 maximum)
+        # Case: No requirement forces an attack; not attacking is a line of play too.
+        if not(maximum):
+            declarations = chain(declarations, [()])
+        # Move ordering: the most power on the attack first.
+        return sorted(declarations, key=lambda declaration: -sum(attacker.p for (attacker, _) in declaration))
+
+    def block_moves(self, attackers, blockers):
+        maximum = max_satisfiable_block_requirements(attackers, blockers)
+        declarations = filter_maximally_obedient(iter_canonical_blocker_declarations(attackers, blockers),
+                                                 count_obeyed_block_requirements,
+                                                 maximum)
+        # Case: No requirement forces a block; not blocking is a line of play too.
+        if not(maximum):
+            declarations = chain(declarations, [{}])
+
+        # Move ordering: the blocks which let the least power through first.
+        def unblocked_power(declaration):
+            blocked = set(chain.from_iterable(declaration.values()))
+            return sum(attacker.p for attacker in attackers if not(attacker in blocked))
+        return sorted(declarations, key=unblocked_power)
+
+    ##########
+    # Leaves #
+    ##########
+    def resolve(self, attack, block, attacker_orders, blocker_orders):
+        '''\
+            Resolve combat damage as Piece.mark_damage_on_victims() would, and evaluate it.
+        '''
+        damage_orders = {}
+        blocked = set([])
+        for (attacker, blockers) in attacker_orders:
+            damage_orders[attacker] = list(blockers)
+            blocked.add(attacker)
+        for (attacker, attackable) in attack:
+            if not(attacker in blocked):
+                damage_orders[attacker] = [attackable]
+        for (blocker, attackers) in blocker_orders:
+            damage_orders[blocker] = list(attackers)
+
+        damage_taken = {}
+        for (source, damage_order) in damage_orders.items():
+            for (victim, amount) in zip(damage_order, damage_outcome(source.p, damage_order)):
+                damage_taken[victim] = damage_taken.get(victim, 0) + amount
+
+        def killed(piece):
+            return piece.touched_by_death or ((piece.marked_damage + damage_taken.get(piece, 0)) >= piece.t)
+
+        attackers_killed = [attacker for (attacker, _) in attack if (attacker in damage_taken) and killed(attacker)]
+        blockers_killed = [blocker for blocker in block if (blocker in damage_taken) and killed(blocker)]
+        damage_to_attackables = {attackable: damage_taken.get(attackable, 0)
+                                 for attackable in set(attackable for (_, attackable) in attack)}
+        return self.evaluation(damage_to_attackables, attackers_killed, blockers_killed)
+
+    ##############
+    # Alpha-Beta #
+    ##############
+    def search_block(self, attack, blockers, alpha, beta):
+        self.visit()
+        attackers = return_attackers(attack)
+        value = None
+        for block in self.block_moves(attackers, blockers):
+            child_value = self.search_attacker_orders(attack, block, alpha, beta)
+            if (value is None) or (child_value < value):
+                value = child_value
+            beta = min(beta, value)
+            if (alpha >= beta):
+                break
+        return value
+
+    def search_attacker_orders(self, attack, block, alpha, beta):
+        self.visit()
+        value = None
+        for attacker_orders in DistinctAssignmentOrderSpace(invert_blocker_declaration(block)):
+            child_value = self.search_blocker_orders(attack, block, attacker_orders, alpha, beta)
+            if (value is None) or (child_value > value):
+                value = child_value
+            alpha = max(alpha, value)
+            if (alpha >= beta):
+                break
+        return value
+
+    def search_blocker_orders(self, attack, block, attacker_orders, alpha, beta):
+        self.visit()
+        value = None
+        for blocker_orders in DistinctAssignmentOrderSpace(block):
+            self.visit()
+            child_value = self.resolve(attack, block, attacker_orders, blocker_orders)
+            if (value is None) or (child_value < value):
+                value = child_value
+            beta = min(beta, value)
+            if (alpha >= beta):
+                break
+        return value
+
+    def solve_attack(self, attackers, attackables, blockers):
+        '''\
+            Return the CombatSolution holding the best declaration of attackers for the
+            attacking player, possibly empty (i.e., not attacking); None when the budget
+            ran out before any was fully searched.
+        '''
+        self.reset_budget()
+        best_declaration = None
+        best_value = None
+        complete = True
+        try:
+            for attack in self.attack_moves(attackers, attackables):
+                alpha = best_value if (best_value is not None) else float("-inf")
+                value = self.search_block(attack, blockers, alpha, float("inf"))
+                if (best_value is None) or (value > best_value):
+                    best_value = value
+                    best_declaration = attack
+        except SearchBudgetExhausted:
+            complete = False
+        return CombatSolution(best_declaration, best_value, self.n_nodes, complete)
+
+    def solve_block(self, attack, blockers):
+        '''\
+            Return the CombatSolution holding the best declaration of blockers for the
+            defending player against a given declaration of attackers, possibly empty
+            (i.e., not blocking); None when the budget ran out before any was fully searched.
+        '''
+        self.reset_budget()
+        attackers = return_attackers(attack)
+        best_declaration = None
+        best_value = None
+        complete = True
+        try:
+            for block in self.block_moves(attackers, blockers):
+                beta = best_value if (best_value is not None) else float("inf")
+                value = self.search_attacker_orders(attack, block, float("-inf"), beta)
+                if (best_value is None) or (value < best_value):
+                    best_value = value
+                    best_declaration = block
+        except SearchBudgetExhausted:
+            complete = False
+        return CombatSolution(best_declaration, best_value, self.n_nodes, complete)
+
+
+class SolverChoiceMixin:
+    '''\
+        Answers the declare attackers / declare blockers turn-based actions with a
+        CombatSolver search, deferring to the next class in the MRO otherwise.
+    '''
+    solver = None
+
+    def choose_option(self, options):
+        ability = getattr(options, "ability", None)
+        if (self.solver is not None) and (ability is not None):
+            if (ability.tba_name == "TBA_DECLAREATTACKERS"):
+                blockers = [piece for piece in self.is_attacking.controlled_pieces if piece.can_block]
+                solution = self.solver.solve_attack(attackers=ability.solve_attackers_given_actor(self),
+                                                    attackables=ability.solve_attackables_given_actor(self),
+                                                    blockers=blockers)
+                # Case: Out of budget before any declaration was fully searched.
+                if (solution.declaration is None):
+                    return super().choose_option(options)
+                # Case: Not attacking at all is the best line of play.
+                if not(solution.declaration):
+                    return self.pass_binding
+                return Binding(actor=self, ability=ability, target_subscope=solution.declaration)
+            elif (ability.tba_name == "TBA_DECLAREBLOCKERS"):
+                solution = self.solver.solve_block(attack=self.is_being_attacked_by.attacker_declaration,
+                                                   blockers=ability.solve_blockers_given_actor(self))
+                # Case: Out of budget before any declaration was fully searched.
+                if (solution.declaration is None):
+                    return super().choose_option(options)
+                # Case: Not blocking at all is the best line of play.
+                if not(solution.declaration):
+                    return self.pass_binding
+                return Binding(actor=self, ability=ability, target_subscope=solution.declaration)
+        return super().choose_option(options)
+
+
+class SolverPlayer(SolverChoiceMixin, Player):
+    pass
@@ -0,0 +1,275 @@
+from target import *
+from combat import *
+import mmap
+import struct
+import sys
+
+
+#########################################################
+# Precomputed Combat Tablebase for Small Vanilla Boards #
+#########################################################
+# NOTE #
+# A configuration is a multiset of attacker (p, t) types against a multiset of blocker
+# (p, t) types, where every piece is a vanilla creature (no marked damage, deathtouch,
+# restrictions or requirements, and each blocker blocks at most one attacker). The
+# tablebase holds, for every configuration, the block which is optimal for the defending
+# player w.r.t. block_score() together with its outcome, as fixed size records indexed
+# by the rank of the configuration; so a probe is a rank computation plus one read.
+
+# NOTE # Bumped whenever block_score() changes, so stale tablebases fail to load.
+TABLEBASE_MAGIC = b"ENGTB\x00\x02\x00"
+TABLEBASE_HEADER = struct.Struct("<8s6B2x")
+# NOTE # Record = [unblocked damage, n attackers killed, n blockers lost, defender score]
+#        followed by one byte per blocker slot (0: no block; k: blocks attacker slot k-1).
+TABLEBASE_OUTCOME = struct.Struct("<BBBh")
+
+
+def block_score(attacker, blockers, kill_weight=1, loss_weight=1, life_weight=1):
+    '''\
+        Evaluate, from the defending player's point of view, a set of (p, t) blockers
+        blocking a (p, t) attacker, assuming the attacker kills the most valuable set
+        of blockers (by total p + t) whose total toughness is within its power, which
+        does not depend on the order of blockers. Return a 4-tuple of the form:
+            [0] defender score
+            [1] unblocked damage
+            [2] whether the attacker is killed
+            [3] number of blockers lost
+    '''
+    (p, t) = attacker
+    # Case: Unblocked.
+    if not(blockers):
+        return (-life_weight * p, p, False, 0)
+    attacker_killed = sum(blocker[0] for blocker in blockers) >= t
+    # NOTE # The attacker orders its blockers so that any set of them whose total
+    #        toughness is at most p dies; ties in value go to killing more of them.
+    (value_lost, n_lost) = (0, 0)
+    for killed in subpowerset(blockers, n=1, N=None):
+        if (sum(blocker[1] for blocker in killed) <= p):
+            (value_lost, n_lost) = max((value_lost, n_lost), (sum(map(sum, killed)), len(killed)))
+    score = (kill_weight * sum(attacker) * attacker_killed) - (loss_weight * value_lost)
+    return (score, 0, attacker_killed, n_lost)
+
+
+def solve_optimal_block(attackers, blockers, **weights):
+    '''\
+        Return the block of (p, t) attackers by (p, t) blockers maximizing the total
+        block_score(), as a 2-tuple of the form:
+            [0] tuple holding, for each blocker, 0 (no block) or 1 + the attacker it blocks
+            [1] (unblocked damage, n attackers killed, n blockers lost, defender score)
+
+        Scores are additive over attackers, so this is a dynamic program over the
+        attackers and the bitmask of blockers already used: O(|A| * 3 ** |B|).
+    '''
+    n_blockers = len(blockers)
+    full_mask = (1 << n_blockers) - 1
+    scores = [[block_score(attacker, [blockers[j] for j in range(n_blockers) if (mask >> j) & 1], **weights)
+               for mask in range(full_mask + 1)]
+              for attacker in attackers]
+
+    # best[mask] = (score, per-attacker masks) over the attackers processed so far.
+    best = {0: (0, ())}
+    for i in range(len(attackers)):
+        next_best = {}
+        for used_mask, (score, assignment) in best.items():
+            free_mask = full_mask & ~used_mask
+            submask = free_mask
+            while True:
+                new_score = score + scores[i][submask][0]
+                new_mask = used_mask | submask
+                if not(new_mask in next_best) or (new_score > next_best[new_mask][0]):
+                    next_best[new_mask] = (new_score, assignment + (submask,))
+                if not(submask):
+                    break
+                submask = (submask - 1) & free_mask
+        best = next_best
+
+    (score, assignment) = max(best.values(), key=lambda item: item[0])
+    slots = [0] * n_blockers
+    damage = n_killed = n_lost = 0
+    for i, submask in enumerate(assignment):
+        (_, attacker_damage, attacker_killed, n_blockers_lost) = scores[i][submask]
+        damage += attacker_damage
+        n_killed += attacker_killed
+        n_lost += n_blockers_lost
+        for j in range(n_blockers):
+            if (submask >> j) & 1:
+                slots[j] = i + 1
+    return tuple(slots), (damage, n_killed, n_lost, score)
+
+
+def rank_multiset(types, n_types, min_size):
+    '''\
+        Return the index of a non-decreasing tuple of type indices among all such tuples
+        of length >= min_size, ordered by length, then as combinations_with_replacement.
+    '''
+    m = len(types)
+    offset = sum(comb(n_types + j - 1, j) for j in range(min_size, m))
+    return offset + rank_combination([x + i for i, x in enumerate(types)], n_types + m - 1)
+
+
+def count_multisets(n_types, min_size, max_size):
+    return sum(comb(n_types + m - 1, m) for m in range(min_size, max_size + 1))
+
+
+class CombatTablebase:
+    '''\
+        Optimal blocks for every small vanilla combat, read from a memory-mapped file
+        written by CombatTablebase.generate().
+    '''
+    def __init__(self, max_attackers, max_blockers, p_min, p_max, t_min, t_max, buffer=None):
+        self.max_attackers = max_attackers
+        self.max_blockers = max_blockers
+        self.p_min = p_min
+        self.p_max = p_max
+        self.t_min = t_min
+        self.t_max = t_max
+        self.types = [(p, t) for p in range(p_min, p_max + 1) for t in range(t_min, t_max + 1)]
+        self.type_idx = {pt: k for k, pt in enumerate(self.types)}
+        self.n_types = len(self.types)
+        self.n_attacker_multisets = count_multisets(self.n_types, 1, max_attackers)
+        self.n_blocker_multisets = count_multisets(self.n_types, 0, max_blockers)
+        self.record_size = TABLEBASE_OUTCOME.size + max_blockers
+        self.buffer = buffer
+
+    @property
+    def n_records(self):
+        return self.n_attacker_multisets * self.n_blocker_multisets
+
+    def record_offset(self, attacker_types, blocker_types):
+        rank = (rank_multiset(attacker_types, self.n_types, 1) * self.n_blocker_multisets
+                + rank_multiset(blocker_types, self.n_types, 0))
+        return TABLEBASE_HEADER.size + rank * self.record_size
+
+    @classmethod
+    def generate(cls, path, max_attackers=4, max_blockers=4, p_min=1, p_max=3, t_min=1, t_max=3, **weights):
+        '''\
+            Solve every configuration and write the tablebase to path.
+        '''
+        tablebase = cls(max_attackers, max_blockers, p_min, p_max, t_min, t_max)
+        records = bytearray(tablebase.n_records * tablebase.record_size)
+        slot_format = struct.Struct("<{}B".format(max_blockers))
+        position = 0
+        for n_attackers in range(1, max_attackers + 1):
+            for attacker_types in combinations_with_replacement(range(tablebase.n_types), n_attackers):
+                attackers = [tablebase.types[k] for k in attacker_types]
+                for n_blockers in range(0, max_blockers + 1):
+                    for blocker_types in combinations_with_replacement(range(tablebase.n_types), n_blockers):
+                        blockers = [tablebase.types[k] for k in blocker_types]
+                        slots, outcome = solve_optimal_block(attackers, blockers, **weights)
+                        TABLEBASE_OUTCOME.pack_into(records, position, *outcome)
+                        padded_slots = list(slots) + [0] * (max_blockers - n_blockers)
+                        slot_format.pack_into(records, position + TABLEBASE_OUTCOME.size, *padded_slots)
+                        position += tablebase.record_size
+        with open(path, "wb") as f:
+            f.write(TABLEBASE_HEADER.pack(TABLEBASE_MAGIC, max_attackers, max_blockers, p_min, p_max, t_min, t_max))
+            f.write(records)
+        return tablebase
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, *parameters) = TABLEBASE_HEADER.unpack_from(buffer, 0)
+        if (magic != TABLEBASE_MAGIC):
+            raise ValueError("{} is not a combat tablebase.".format(path))
+        return cls(*parameters, buffer=buffer)
+
+    def close(self):
+        if (self.buffer is not None):
+            self.buffer.close()
+            self.buffer = None
+
+    def is_vanilla(self, piece):
+        return ((piece.p, piece.t) in self.type_idx
+                and not(piece.marked_damage or piece.touched_by_death or piece.has_deathtouch)
+                and not(piece.cannot_attack or piece.cannot_block)
+                and not(piece.cannot_attack_alone or piece.cannot_block_alone)
+                and not(piece.must_attack_if_able or piece.must_block_if_able)
+                and not(piece.must_be_blocked_if_able)
+                and (piece.min_block_n <= 1) and (piece.max_block_n == 1))
+
+    def canonicalize(self, pieces):
+        return sorted(pieces, key=lambda piece: self.type_idx[(piece.p, piece.t)])
+
+    def covers(self, attackers, blockers):
+        return ((1 <= len(attackers) <= self.max_attackers)
+                and (len(blockers) <= self.max_blockers)
+                and all(self.is_vanilla(piece) for piece in chain(attackers, blockers)))
+
+    def probe(self, attackers, blockers):
+        '''\
+            Return the optimal block of attackers by blockers as a 2-tuple of the form:
+                [0] blocker declaration (see solve_blocker_declarations), possibly empty
+                [1] (unblocked damage, n attackers killed, n blockers lost, defender score)
+            or None when the combat is not covered by this tablebase.
+        '''
+        if not(self.covers(attackers, blockers)):
+            return None
+        attackers = self.canonicalize(attackers)
+        blockers = self.canonicalize(blockers)
+        offset = self.record_offset([self.type_idx[(a.p, a.t)] for a in attackers],
+                                    [self.type_idx[(b.p, b.t)] for b in blockers])
+        outcome = TABLEBASE_OUTCOME.unpack_from(self.buffer, offset)
+        slots = self.buffer[offset + TABLEBASE_OUTCOME.size:offset + TABLEBASE_OUTCOME.size + len(blockers)]
+        declaration = {blocker: (attackers[slot - 1],) for (blocker, slot) in zip(blockers, slots) if slot}
+        return declaration, outcome
+
+    def probe_attack(self, attackers, blockers, attackable):
+        '''\
+            Return the declaration of attackers (against attackable) which leaves the
+            defending player worst off, given they answer it with the optimal block, or
+            None when the combat is not covered by this tablebase.
+        '''
+        if not(self.covers(attackers, blockers)):
+            return None
+        best_declaration = None
+        best_score = None
+        seen_types = set([])
+        for attacker_subset in subpowerset(self.canonicalize(attackers), n=1, N=None):
+            # Case: Same multiset of types as a subset already probed.
+            types = tuple((a.p, a.t) for a in attacker_subset)
+            if (types in seen_types):
+                continue
+            seen_types.add(types)
+            (_, outcome) = self.probe(list(attacker_subset), blockers)
+            if (best_score is None) or (outcome[3] < best_score):
+                best_score = outcome[3]
+                best_declaration = tuple((attacker, attackable) for attacker in attacker_subset)
+        return best_declaration
+
+
+class TablebaseChoiceMixin:
+    '''\
+        Answers the declare attackers / declare blockers turn-based actions with
+        tablebase probes when the combat is covered, deferring to the next class in
+        the MRO otherwise.
+    '''
+    tablebase = None
+
+    def choose_option(self, options):
+        ability = getattr(options, "ability", None)
+        if (self.tablebase is not None) and (ability is not None):
+            if (ability.tba_name == "TBA_DECLAREBLOCKERS"):
+                attackers = self.is_being_attacked_by.attackers
+                blockers = ability.solve_blockers_given_actor(self)
+                probed = self.tablebase.probe(attackers, blockers)
+                if (probed is not None):
+                    # Case: Not blocking at all is the optimal block.
+                    if not(probed[0]):
+                        return self.pass_binding
+                    return Binding(actor=self, ability=ability, target_subscope=probed[0])
+            elif (ability.tba_name == "TBA_DECLAREATTACKERS"):
+                attackers = ability.solve_attackers_given_actor(self)
+                blockers = [piece for piece in self.is_attacking.controlled_pieces if piece.can_block]
+                declaration = self.tablebase.probe_attack(attackers, blockers, self.is_attacking)
+                if (declaration is not None):
+                    return Binding(actor=self, ability=ability, target_subscope=declaration)
+        return super().choose_option(options)
+
+
+class TablebasePlayer(TablebaseChoiceMixin, Player):
+    pass
+
+
+if __name__ == "__main__":
+    CombatTablebase.generate(sys.argv[1])
@@ -1,27 +1,101 @@
 from pieces import *
 
 
+# NOTE #
+# Filtrations resolve against the Game the actor is registered in, via its TargetIndex,
+# and only fall back to the module-level PLAYERS / PIECES for an unregistered actor.
+PIECE_TYPES = ("creature", "planeswalker")
+
+
+def piece_types(piece):
+    return tuple(piece_type for piece_type in PIECE_TYPES if getattr(piece, "is_" + piece_type))
+
+
+class TargetIndex:
+    '''\
+        Candidate target sets for every player of a Game, precomputed from the team_id
+        of each player and the owner and type of each piece; none of which change
+        over the course of a game.
+    '''
+    def __init__(self, players, pieces):
+        self.players = tuple(players)
+        self.pieces = tuple(pieces)
+        self.other_players = {}
+        self.allies = {}
+        self.enemies = {}
+        self.actor_pieces = {}
+        self.opponent_pieces = {}
+        self.pieces_by_type = defdict(tuple)
+        self.opponent_pieces_by_type = defdict(tuple)
+        for player in self.players:
+            self.other_players[player] = tuple(other for other in self.players if (other is not player))
+            self.allies[player] = tuple(other for other in self.other_players[player] if (other.team_id == player.team_id))
+            self.enemies[player] = tuple(other for other in self.other_players[player] if (other.team_id != player.team_id))
+            self.actor_pieces[player] = tuple(piece for piece in self.pieces if (piece.owner is player))
+            self.opponent_pieces[player] = tuple(piece for piece in self.pieces if (piece.owner is not player))
+        for piece_type in PIECE_TYPES:
+            self.pieces_by_type[piece_type] = tuple(piece for piece in self.pieces if (piece_type in piece_types(piece)))
+            for player in self.players:
+                self.opponent_pieces_by_type[(player, piece_type)] = tuple(piece for piece in self.opponent_pieces[player]
+                                                                           if (piece_type in piece_types(piece)))
+
+
+def target_index(actor):
+    '''\
+        Return the TargetIndex of the Game actor is registered in, or None.
+    '''
+    if (actor.environment is None):
+        return None
+    return actor.environment.target_index
+
+
 def same_player(actor):
     return [actor]
 
 
 def other_players(actor):
     ''' Assumes that actors can never target themselves with an Ability. '''
+    index = target_index(actor)
+    if (index is not None):
+        return index.other_players[actor]
     return filter(lambda player: (player is not actor), PLAYERS)
 
 
 def opponent_pieces(actor):
+    index = target_index(actor)
+    if (index is not None):
+        return index.opponent_pieces[actor]
     return filter(lambda piece: (piece.owner is not actor), PIECES)
 
 
 def actor_pieces(actor):
+    index = target_index(actor)
+    if (index is not None):
+        return index.actor_pieces[actor]
     return filter(lambda piece: (piece.owner is actor), PIECES)
 
 
 def all_pieces(actor):
+    index = target_index(actor)
+    if (index is not None):
+        return index.pieces
     return PIECES
 
 
+def all_creatures(actor):
+    index = target_index(actor)
+    if (index is not None):
+        return index.pieces_by_type["creature"]
+    return filter(lambda piece: piece.is_creature, PIECES)
+
+
+def opponent_creatures(actor):
+    index = target_index(actor)
+    if (index is not None):
+        return index.opponent_pieces_by_type[(actor, "creature")]
+    return filter(lambda piece: piece.is_creature, opponent_pieces(actor))
+
+
 def filter_by_identity_and_team_ids(actor, legal_team_ids):
     '''\
         Return the subset of PLAYERS which:
@@ -34,30 +108,53 @@ def filter_by_identity_and_team_ids(actor, legal_team_ids):
 
 
 def allies(actor):
-    ''' Assumes that team_ids are either 0 or 1. '''
+    ''' Assumes that team_ids are either 0 or 1 when actor is not registered in a Game. '''
+    index = target_index(actor)
+    if (index is not None):
+        return index.allies[actor]
     return filter_by_identity_and_team_ids(actor, {actor.team_id})
 
 
 def enemies(actor):
-    ''' Assumes that team_ids are either 0 or 1. '''
+    ''' Assumes that team_ids are either 0 or 1 when actor is not registered in a Game. '''
+    index = target_index(actor)
+    if (index is not None):
+        return index.enemies[actor]
     return filter_by_identity_and_team_ids(actor, {not(actor.team_id)})
 
+
 def all_players(actor):
+    index = target_index(actor)
+    if (index is not None):
+        return index.players
     return PLAYERS
 
 
 class TargetData:
     '''\
         Only supports cardinality constraints which are fixed constants given as size.
+        Target subscopes are interned per actor in the actor's Game until its mutation
+        clock ticks, so repeated priority windows share the same tuples rather than
+        rebuilding them; the interned tuples go away along with their Game.
     '''
     def __init__(self, size, filtration):
         self.size = size
         self.filtration = filtration
 
     def solve_target_subscopes_given_actor(self, actor):
-        # -> List[Tuple[Player]]
-        candidate_target_set = self.filtration(actor)
-        return list(combinations(candidate_target_set, self.size))
+        # -> Tuple[Tuple[Player]]
+        environment = actor.environment
+        # Case: Not registered with a Game; there is nowhere to intern them.
+        if (environment is None):
+            return tuple(combinations(self.filtration(actor), self.size))
+        key = (self, actor)
+        version = environment.mutation_clock.version
+        interned = environment.interned_subscopes.get(key)
+        if (interned is not None) and (interned[0] == version):
+            return interned[1]
+        target_subscopes = tuple(combinations(self.filtration(actor), self.size))
+        environment.interned_subscopes[key] = (version, target_subscopes)
+        return target_subscopes
 
 
 TARGET_single_self = TargetData(1, same_player)
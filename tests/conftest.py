@@ -0,0 +1,22 @@
+import pytest
+
+from engine import *
+
+
+def new_game():
+    '''\
+        Return a fresh, headless Game of two players with three pieces each.
+    '''
+    q0 = Player(debug_name="A", team_id=0, stats=StatMap(speed=0, strength=1, hp=20, magic=3), pieces=[])
+    q1 = Player(debug_name="B", team_id=1, stats=StatMap(speed=0, strength=1, hp=20, magic=3), pieces=[])
+    pieces = [ViciousConquistador(q0, [AbilityAttack()]), ViciousConquistador(q0, [AbilityHealAll()]),
+              Piece(q0, "Legion Lieutenant", 2, 2), Piece(q1, "Skymarcher Aspirant", 2, 1),
+              ViciousConquistador(q1, [AbilityAttack()]), Piece(q1, "Brazen Borrower", 3, 1)]
+    game = Game(players=[q0, q1], pieces=pieces)
+    game.sink = NullSink()
+    return game
+
+
+@pytest.fixture
+def game_factory():
+    return new_game
@@ -0,0 +1,70 @@
+from engine import *
+
+
+def brute_force_abilities(game, player):
+    return [ability
+            for piece in game.pieces if (piece.owner is player)
+            for ability in piece.ability_list if verify_ability(piece, ability)]
+
+
+def first_action(game):
+    '''\
+        Step game up to the first priority grant at which its player has an ability
+        to activate.
+    '''
+    np.random.seed(0)
+    decision_point = game.reset()
+    while not((decision_point.kind == DecisionPoint.ACTION) and brute_force_abilities(game, decision_point.player)):
+        decision_point.decide()
+        decision_point = game.step(decision_point.index)
+    return decision_point
+
+
+def assert_index_agrees(game):
+    for player in game.players:
+        assert game.ability_index.solve_active_abilities(player) == brute_force_abilities(game, player)
+
+
+def test_same_ability_twice_keeps_both_positions(game_factory):
+    game = game_factory()
+    player = first_action(game).player
+    ability = brute_force_abilities(game, player)[0]
+    piece = next(piece for piece in player.pieces if (ability in piece.ability_list))
+    other = type(ability)()
+    piece.ability_list = [ability, other, ability]
+    active = game.ability_index.solve_active_abilities(player)
+    assert active.count(ability) == 2
+    assert active.index(other) == active.index(ability) + 1
+    assert_index_agrees(game)
+
+
+def test_owner_and_controller_changes_reindex(game_factory):
+    game = game_factory()
+    first_action(game)
+    (q0, q1) = game.players
+    assert_index_agrees(game)
+    for piece in list(q0.pieces):
+        piece.owner = q1
+        assert (piece in q1.pieces) and not(piece in q0.pieces)
+        assert (piece in q1.controlled_pieces) and not(piece in q0.controlled_pieces)
+        assert_index_agrees(game)
+    piece = q1.pieces[0]
+    piece.controller = q0
+    assert (piece in q0.controlled_pieces) and not(piece in q1.controlled_pieces)
+    piece.owner = q0
+    piece.owner = q1
+    assert (piece in q0.controlled_pieces) and (piece in q1.pieces)
+    assert_index_agrees(game)
+
+
+def test_turn_based_actions_follow_control(game_factory):
+    game = game_factory()
+    (q0, q1) = game.players
+    piece = q0.pieces[0]
+    piece.controller = q1
+    piece.is_tapped = True
+    assert piece in TBA_Untap("AP").solve_target_subscopes_given_actor(q1)[0]
+    assert not(piece in TBA_Untap("AP").solve_target_subscopes_given_actor(q0)[0])
+    piece.is_tapped = False
+    assert piece in TBA_DeclareBlockers("NAP").solve_blockers_given_actor(q1)
+    assert not(piece in TBA_DeclareBlockers("NAP").solve_blockers_given_actor(q0))
@@ -0,0 +1,22 @@
+import random
+
+from engine import *
+
+
+def test_vectorized_damage_matches_scalar_with_players_anywhere():
+    rng = random.Random(13)
+    for _ in range(200):
+        players = [Player("P{}".format(i), i, StatMap(speed=0, strength=1, hp=20, magic=3), []) for i in range(2)]
+        victims = players + [Piece(None, "v{}".format(i), 1, rng.randint(1, 4)) for i in range(4)]
+        sources = [Piece(None, "s{}".format(i), rng.randint(0, 6), 1) for i in range(3)]
+        for source in sources:
+            source.damage_order = rng.sample(victims, rng.randint(0, 4))
+
+        expected = defdict(int)
+        for source in sources:
+            for subevent in source.mark_damage_on_victims():
+                expected[id(subevent.victim)] += subevent.amount
+
+        _, got_victims, _, _, totals = solve_combat_damage(sources)
+        got = {id(victim): total for (victim, total) in zip(got_victims, totals.tolist())}
+        assert got == dict(expected)
@@ -0,0 +1,29 @@
+import pytest
+
+from engine import *
+
+
+def test_buffer_is_bounded_and_reusable():
+    source, victim = Piece(None, "s", 1, 1), Piece(None, "v", 1, 1)
+    buffer = DamageEventBuffer(capacity=3)
+    buffer.add(source, victim, 1)
+    with pytest.raises(DamageEventBufferOverflow):
+        buffer.extend([DamageSubEvent(source, victim, 1)] * 3)
+    # Case: Nothing of a batch which does not fit is staged.
+    assert len(buffer) == 1
+    buffer.extend([DamageSubEvent(source, victim, 2)] * 2)
+    assert [(e.actor, e.victim, e.amount) for e in buffer.aggregate()] == [(source, victim, 5)]
+    with pytest.raises(DamageEventBufferOverflow):
+        buffer.add(source, victim, 1)
+    buffer.clear()
+    buffer.add(source, victim, 1)
+    assert len(buffer) == 1
+
+
+def test_games_stay_within_the_default_capacity(game_factory):
+    for seed in range(5):
+        np.random.seed(seed)
+        game = game_factory()
+        game.vectorized_damage = False
+        game.loop()
+        assert not(len(game.damage_buffer))
@@ -0,0 +1,30 @@
+import pytest
+
+from journal import *
+
+
+def test_journal_bytes_round_trip():
+    journal = Journal(seed=7, checksum_interval=3, choices=[0, 1, 127, 128, 300, 2 ** 40], checksums=[1, 2])
+    restored = Journal.from_bytes(journal.to_bytes())
+    assert (restored.seed, restored.checksum_interval) == (7, 3)
+    assert restored.choices == journal.choices
+    assert restored.checksums == journal.checksums
+
+
+def test_record_replay_round_trip(game_factory):
+    for seed in range(10):
+        recorded = game_factory()
+        journal = record(recorded, seed, checksum_interval=4)
+        assert len(journal)
+        replayed = replay(game_factory(), Journal.from_bytes(journal.to_bytes()))
+        assert state_checksum(replayed) == state_checksum(recorded)
+
+
+def test_replay_detects_tampering(game_factory):
+    journal = record(game_factory(), 0, checksum_interval=1)
+    journal.checksums[len(journal.checksums) // 2] ^= 1
+    with pytest.raises(JournalMismatch):
+        replay(game_factory(), journal)
+    truncated = Journal(journal.seed, 0, journal.choices[:-1])
+    with pytest.raises(JournalMismatch):
+        replay(game_factory(), truncated)
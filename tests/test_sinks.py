@@ -0,0 +1,34 @@
+import gc
+import weakref
+
+from engine import *
+
+
+def test_ring_buffer_records_the_state_at_the_time():
+    sink = RingBufferSink(maxlen=2)
+    blockers = ["b0"]
+    sink.announce(ANNOUNCE_INFO, "COMBAT", "declared {} as blockers", (blockers,))
+    blockers.append("b1")
+    assert sink.messages() == ["declared ['b0'] as blockers"]
+    sink.announce(ANNOUNCE_DEBUG, "DEBUG", "two")
+    sink.announce(ANNOUNCE_DEBUG, "DEBUG", "three")
+    assert sink.messages() == ["two", "three"]
+    assert sink.records[-1] == (ANNOUNCE_DEBUG, "DEBUG", "three")
+
+
+def test_ring_buffer_does_not_keep_pieces_alive():
+    sink = RingBufferSink()
+    piece = Piece(None, "x", 1, 1)
+    alive = weakref.ref(piece)
+    sink.announce(ANNOUNCE_INFO, "ACTION", "{} moved", (piece,))
+    del piece
+    gc.collect()
+    assert (alive() is None) and (len(sink) == 1)
+
+
+def test_sink_levels_and_categories():
+    sink = RingBufferSink(level=ANNOUNCE_INFO, categories=["COMBAT"])
+    sink.announce(ANNOUNCE_DEBUG, "COMBAT", "too low")
+    sink.announce(ANNOUNCE_INFO, "EVENT", "other category")
+    sink.announce(ANNOUNCE_INFO, "COMBAT", "kept")
+    assert sink.messages() == ["kept"]
@@ -0,0 +1,129 @@
+import random
+from itertools import combinations, permutations
+
+from engine import *
+
+
+def new_pieces(prefix, n):
+    return [Piece(None, "{}{}".format(prefix, i), 1, 1) for i in range(n)]
+
+
+def random_board(rng, max_attackers=4, max_blockers=4):
+    A = new_pieces("a", rng.randint(1, max_attackers))
+    B = new_pieces("b", rng.randint(1, max_blockers))
+    for attacker in A:
+        attacker.must_be_blocked_if_able = rng.random() < 0.5
+        attacker.must_attack_if_able = rng.random() < 0.4
+        attacker.cannot_attack_alone = rng.random() < 0.3
+        attacker.cannot_attack = rng.random() < 0.2
+    for blocker in B:
+        blocker.must_block_if_able = rng.random() < 0.4
+        blocker.max_block_n = rng.randint(0, 3)
+        blocker.min_block_n = rng.randint(0, 2)
+        blocker.must_be_attacked_if_able = rng.random() < 0.5
+    return A, B
+
+
+def blocker_key(declaration):
+    return tuple(sorted((id(blocker), tuple(map(id, attackers))) for (blocker, attackers) in declaration.items()))
+
+
+def attacker_key(declaration):
+    return tuple((id(attacker), id(attackable)) for (attacker, attackable) in declaration)
+
+
+def test_combination_rank_unrank_round_trip():
+    for N in range(7):
+        for r in range(N + 1):
+            for index, combination in enumerate(combinations(range(N), r)):
+                assert unrank_combination(range(N), r, index) == combination
+                assert rank_combination(combination, N) == index
+
+
+def test_subpowerset_and_permutation_unrank():
+    x = list("abcde")
+    for index, subset in enumerate(subpowerset(x, 2, 4)):
+        assert unrank_subpowerset(x, 2, 4, index) == subset
+    for index, permutation in enumerate(permutations(x)):
+        assert unrank_permutation(x, index) == permutation
+
+
+def test_mixed_radix_digits_round_trip():
+    space = MixedRadixSpace([3, 1, 4, 2])
+    for rank in range(space.size):
+        digits = space.digits(rank)
+        assert all(0 <= digit < radix for (digit, radix) in zip(digits, space.radices))
+        assert sum(digit * prod(space.radices[i + 1:]) for i, digit in enumerate(digits)) == rank
+
+
+def test_attacker_space_matches_enumeration():
+    rng = random.Random(1)
+    for _ in range(100):
+        (A, B) = random_board(rng)
+        attackables = [Player("P", 1, None, [])] + B
+        space = AttackerDeclarationSpace(A, attackables)
+        expected = list(iter_attacker_declarations(A, attackables))
+        assert space.size == len(expected) == count_attacker_declarations(A, attackables)
+        assert [space[i] for i in range(space.size)] == expected
+
+
+def test_blocker_space_matches_enumeration():
+    rng = random.Random(2)
+    for _ in range(100):
+        (A, B) = random_board(rng)
+        space = BlockerDeclarationSpace(A, B)
+        expected = solve_blocker_declarations(A, B) or []
+        assert space.size == len(expected) == count_blocker_declarations(A, B)
+        assert sorted(map(blocker_key, space)) == sorted(map(blocker_key, expected))
+        assert [blocker_key(space[i]) for i in range(space.size)] == list(map(blocker_key, space))
+
+
+def test_obedient_spaces_match_brute_force():
+    rng = random.Random(3)
+    for _ in range(300):
+        (A, B) = random_board(rng)
+        expected = filter_maximally_obedient(BlockerDeclarationSpace(A, B),
+                                             count_obeyed_block_requirements,
+                                             max_satisfiable_block_requirements(A, B))
+        space = obedient_blocker_declarations(A, B)
+        got = [blocker_key(space[i]) for i in range(space.size)]
+        assert len(set(got)) == len(got)
+        assert sorted(got) == sorted(map(blocker_key, expected))
+
+        attackables = [Player("P", 1, None, [])] + B
+        expected = filter_maximally_obedient(AttackerDeclarationSpace(A, attackables),
+                                             count_obeyed_attack_requirements,
+                                             max_satisfiable_attack_requirements(A, attackables))
+        space = obedient_attacker_declarations(A, attackables)
+        got = [attacker_key(space[i]) for i in range(space.size)]
+        assert len(set(got)) == len(got)
+        assert sorted(got) == sorted(map(attacker_key, expected))
+
+
+def test_sizes_beyond_sys_maxsize():
+    space = BlockerDeclarationSpace(new_pieces("a", 16), new_pieces("b", 16))
+    assert space.size > sys.maxsize
+    assert size_of(space) == space.size
+    assert space[space.size - 1] == space.unrank(space.size - 1)
+    assert len(space.sample(k=3)) == 3
+
+
+def test_index_inverts_getitem():
+    rng = random.Random(4)
+    for _ in range(200):
+        (A, B) = random_board(rng)
+        attackables = [Player("P", 1, None, [])] + B
+        for space in (AttackerDeclarationSpace(A, attackables),
+                      BlockerDeclarationSpace(A, B),
+                      obedient_attacker_declarations(A, attackables),
+                      obedient_blocker_declarations(A, B)):
+            for i in range(min(space.size, 50)):
+                assert space.index(space[i]) == i
+
+
+def test_option_index_ranks_beyond_sys_maxsize():
+    A, B = new_pieces("a", 16), new_pieces("b", 16)
+    actor = Player("P", 1, None, [])
+    options = BindingSequence(actor, TBA_DeclareBlockers("NAP"), BlockerDeclarationSpace(A, B))
+    index = options.size - 12345
+    assert option_index(options, options.bind(options.target_subscopes[index])) == index
@@ -0,0 +1,57 @@
+import pytest
+
+from engine import *
+
+
+def final_state(game):
+    return ([player.stats.hp for player in game.players],
+            [(piece.current_zone, piece.is_tapped, piece.marked_damage) for piece in game.pieces])
+
+
+def test_step_with_own_choices_matches_loop(game_factory):
+    for seed in range(5):
+        np.random.seed(seed)
+        looped = game_factory()
+        looped.loop()
+
+        np.random.seed(seed)
+        stepped = game_factory()
+        n_decisions = 0
+        decision_point = stepped.reset()
+        while (decision_point is not None):
+            decision_point.decide()
+            assert (decision_point.index is not None)
+            decision_point = stepped.step(decision_point.index)
+            n_decisions += 1
+        assert n_decisions
+        assert final_state(stepped) == final_state(looped)
+
+
+def test_step_without_reset_raises(game_factory):
+    with pytest.raises(ValueError):
+        game_factory().step(0)
+
+
+def test_options_rank_their_own_bindings(game_factory):
+    np.random.seed(0)
+    game = game_factory()
+    decision_point = game.reset()
+    while (decision_point is not None):
+        options = decision_point.options
+        for i in range(min(size_of(options), 20)):
+            assert option_index(options, options[i]) == i
+        decision_point.decide()
+        decision_point = game.step(decision_point.index)
+
+
+def test_decide_chooses_among_the_offered_actions(game_factory):
+    game = game_factory()
+    decision_point = game.reset()
+    while (decision_point.kind != DecisionPoint.ACTION):
+        decision_point.decide()
+        decision_point = game.step(decision_point.index)
+    player = decision_point.player
+    player.solve_legals = lambda: pytest.fail("The legal actions were solved again.")
+    decision_point.options = [player.pass_binding]
+    assert decision_point.decide() is None
+    assert decision_point.index == 0
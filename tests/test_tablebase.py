@@ -0,0 +1,79 @@
+import random
+from itertools import permutations, product
+
+from tablebase import *
+
+
+TYPES = [(p, t) for p in range(1, 4) for t in range(1, 4)]
+
+
+def brute_force_block_score(attacker, blockers):
+    '''\
+        block_score() by trying every damage assignment order of the attacker, each of
+        which kills the longest prefix of blockers its power covers.
+    '''
+    (p, t) = attacker
+    if not(blockers):
+        return (-p, p, False, 0)
+    attacker_killed = sum(blocker[0] for blocker in blockers) >= t
+    worst = (0, 0)
+    for order in permutations(blockers):
+        damage_left = p
+        killed = []
+        for blocker in order:
+            if (damage_left < blocker[1]):
+                break
+            damage_left -= blocker[1]
+            killed.append(blocker)
+        worst = max(worst, (sum(map(sum, killed)), len(killed)))
+    return (sum(attacker) * attacker_killed - worst[0], 0, attacker_killed, worst[1])
+
+
+def brute_force_optimal_score(attackers, blockers):
+    best = None
+    for slots in product(range(len(attackers) + 1), repeat=len(blockers)):
+        score = sum(brute_force_block_score(attacker, [blocker for (blocker, slot) in zip(blockers, slots) if (slot == i + 1)])[0]
+                    for i, attacker in enumerate(attackers))
+        if (best is None) or (score > best):
+            best = score
+    return best
+
+
+def test_block_score_matches_brute_force_in_any_order():
+    rng = random.Random(20211202)
+    for _ in range(500):
+        attacker = rng.choice(TYPES)
+        blockers = [rng.choice(TYPES) for _ in range(rng.randint(0, 4))]
+        expected = brute_force_block_score(attacker, blockers)
+        assert block_score(attacker, blockers) == expected
+        rng.shuffle(blockers)
+        assert block_score(attacker, blockers) == expected
+
+
+def test_solve_optimal_block_matches_brute_force():
+    rng = random.Random(20211203)
+    for _ in range(200):
+        attackers = [rng.choice(TYPES) for _ in range(rng.randint(1, 3))]
+        blockers = [rng.choice(TYPES) for _ in range(rng.randint(0, 3))]
+        (slots, outcome) = solve_optimal_block(attackers, blockers)
+        assert outcome[3] == brute_force_optimal_score(attackers, blockers)
+        # The block the tablebase records must achieve the score it records.
+        assert outcome[3] == sum(block_score(attacker, [blocker for (blocker, slot) in zip(blockers, slots) if (slot == i + 1)])[0]
+                                 for i, attacker in enumerate(attackers))
+
+
+def test_probe_matches_brute_force(tmp_path):
+    path = str(tmp_path / "small.tb")
+    CombatTablebase.generate(path, max_attackers=2, max_blockers=3)
+    tablebase = CombatTablebase.load(path)
+    rng = random.Random(20211204)
+    try:
+        for _ in range(200):
+            attackers = [Piece(None, "a{}".format(i), *rng.choice(TYPES)) for i in range(rng.randint(1, 2))]
+            blockers = [Piece(None, "b{}".format(i), *rng.choice(TYPES)) for i in range(rng.randint(0, 3))]
+            (declaration, outcome) = tablebase.probe(attackers, blockers)
+            assert outcome[3] == brute_force_optimal_score([(a.p, a.t) for a in attackers],
+                                                           [(b.p, b.t) for b in blockers])
+            assert all(len(blocked) == 1 for blocked in declaration.values())
+    finally:
+        tablebase.close()
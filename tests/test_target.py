@@ -0,0 +1,49 @@
+import tracemalloc
+
+from engine import *
+
+
+def new_player(debug_name, team_id):
+    return Player(debug_name=debug_name, team_id=team_id, stats=StatMap(hp=20), pieces=[])
+
+
+def test_interned_subscopes_are_not_shared_across_games():
+    (a, b, c) = (new_player("A", 0), new_player("B", 1), new_player("C", 1))
+    target_data = TargetData(1, enemies)
+    Game(players=[a, b], pieces=[Piece(a, "x", 1, 1)])
+    assert target_data.solve_target_subscopes_given_actor(a) == ((b,),)
+    # Both Games' clocks are at the same version; a must still see its new enemy.
+    Game(players=[a, c], pieces=[Piece(a, "y", 1, 1)])
+    assert target_data.solve_target_subscopes_given_actor(a) == ((c,),)
+
+
+def test_interned_subscopes_are_replaced_when_the_clock_ticks():
+    game = Game(players=[new_player("A", 0), new_player("B", 1)], pieces=[])
+    actor = game.players[0]
+    target_data = TargetData(1, enemies)
+    first = target_data.solve_target_subscopes_given_actor(actor)
+    assert target_data.solve_target_subscopes_given_actor(actor) is first
+    game.mutation_clock.tick()
+    second = target_data.solve_target_subscopes_given_actor(actor)
+    assert (second == first) and not(second is first)
+    # The stale entry is replaced, not kept alongside.
+    assert game.interned_subscopes == {(target_data, actor): (game.mutation_clock.version, second)}
+
+
+def test_interning_allocates_less_than_solving_afresh():
+    game = Game(players=[new_player("A", 0), new_player("B", 1), new_player("C", 1)], pieces=[])
+    actor = game.players[0]
+    target_data = TargetData(1, enemies)
+    n_lookups = 2000
+
+    def allocated(solve):
+        tracemalloc.start()
+        kept = [solve() for _ in range(n_lookups)]
+        (size, _) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return size
+
+    interned = allocated(lambda: target_data.solve_target_subscopes_given_actor(actor))
+    afresh = allocated(lambda: tuple(combinations(enemies(actor), 1)))
+    # Interned lookups only grow the list holding the results.
+    assert interned * 3 < afresh
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from vecgame import *
+
+
+def test_vecgame_steps_in_lockstep(game_factory):
+    vecgame = VecGame(game_factory, 4)
+    batch = vecgame.reset()
+    for _ in range(200):
+        (features, mask) = batch.option_features()
+        assert features.shape[:2] == mask.shape
+        assert ((features[..., 0] >= 0) == mask).all()
+        assert (batch.option_mask().sum(axis=1) == np.minimum(batch.n_options.astype(np.int64), 64)).all()
+        (batch, finished) = vecgame.step(batch.sample())
+        assert (finished.shape == (4,))
+    assert (vecgame.n_decisions == 800)
+
+
+def test_batch_of_a_space_beyond_int64(game_factory):
+    game = game_factory()
+    player = game.players[0]
+    A = [Piece(None, "a{}".format(i), 1, 1) for i in range(16)]
+    B = [Piece(None, "b{}".format(i), 1, 1) for i in range(16)]
+    ability = SimpleNamespace(ability_name="TBA_DeclareBlockers")
+    options = BindingSequence(player, ability, BlockerDeclarationSpace(A, B))
+    decision_point = DecisionPoint(player, options, SimpleNamespace(msg="Declare Blockers Step"), DecisionPoint.OPTION)
+    batch = DecisionBatch([decision_point], [game])
+    assert batch.n_options[0] == options.size > 2 ** 63
+    assert batch.option_mask(max_options=8).shape == (1, 8)
+    (features, mask) = batch.option_features(max_options=8)
+    assert features.shape == (1, 8, len(OPTION_FEATURES)) and mask.all()
+    [choice] = batch.sample()
+    assert 0 <= choice < options.size
@@ -1,12 +1,22 @@
 from operator import add as ADD
 from operator import sub as SUB
 from operator import xor
-from itertools import combinations, product, chain
+from itertools import combinations, combinations_with_replacement, permutations, product, chain, islice, repeat, accumulate
 from collections import defaultdict as defdict
+from collections import OrderedDict
+from collections import deque
 from copy import deepcopy
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from math import comb, factorial, prod
 import uuid
+import json
+import os
+import re
+import sys
 import numpy as np
 np.random.seed(20211202)
+MAX_RANDINT = 2 ** 62
 
 ##################################
 # Combinatorics Helper Functions #
@@ -42,6 +52,361 @@ def subpowerset(x, n=1, N=None):
     return chain.from_iterable(combinations(x, r) for r in range(n, N_))
 
 
+def take(iterable, k):
+    '''\
+        Return a list of (at most) the first k items of iterable without
+        consuming the remainder of it.
+    '''
+    return list(islice(iterable, k))
+
+
+def reservoir_sample(iterable, k):
+    '''\
+        Return a uniform sample of (at most) k items of iterable in a single pass,
+        holding only k items in memory at any time (Algorithm R).
+    '''
+    reservoir = []
+    for i, item in enumerate(iterable):
+        if (i < k):
+            reservoir.append(item)
+        else:
+            j = np.random.randint(i + 1)
+            if (j < k):
+                reservoir[j] = item
+    return reservoir
+
+
+def multiset_assignments(n_options, m):
+    '''\
+        Generate the ways m interchangeable items may each choose one of n_options
+        options, up to permutation of the items. Yields 2-tuples of the form:
+            [0] a non-decreasing tuple of m option indices (the representative)
+            [1] the number of distinct assignments it stands for (its multiplicity)
+    '''
+    m_factorial = factorial(m)
+    for choice in combinations_with_replacement(range(n_options), m):
+        multiplicity = m_factorial
+        for option_index in set(choice):
+            multiplicity //= factorial(choice.count(option_index))
+        yield (choice, multiplicity)
+
+
+def random_below(n, rng=np.random):
+    '''\
+        Draw an integer uniformly from range(n) using rng (anything with a numpy
+        style randint()). Supports n beyond the int64 range by rejection sampling
+        over 31-bit chunks.
+    '''
+    if (n <= MAX_RANDINT):
+        return int(rng.randint(n))
+    n_bits = n.bit_length()
+    mask = (1 << n_bits) - 1
+    while True:
+        value = 0
+        for _ in range(0, n_bits, 31):
+            value = (value << 31) | int(rng.randint(1 << 31))
+        value &= mask
+        if (value < n):
+            return value
+
+
+def unrank_combination(x, r, index):
+    '''\
+        Return the index-th element of combinations(x, r) without generating
+        any of the elements preceding it.
+    '''
+    N = len(x)
+    result = []
+    start = 0
+    for remaining in range(r, 0, -1):
+        for i in range(start, N):
+            n_starting_here = comb(N - i - 1, remaining - 1)
+            if (index < n_starting_here):
+                result.append(x[i])
+                start = i + 1
+                break
+            index -= n_starting_here
+    return tuple(result)
+
+
+def rank_combination(indices, N):
+    '''\
+        Inverse of unrank_combination(range(N), len(indices), .), i.e., return the
+        position of the increasing tuple indices within combinations(range(N), len(indices)).
+    '''
+    rank = 0
+    r = len(indices)
+    previous = -1
+    for i, index in enumerate(indices):
+        for skipped in range(previous + 1, index):
+            rank += comb(N - skipped - 1, r - i - 1)
+        previous = index
+    return rank
+
+
+def rank_subpowerset(indices, n, N):
+    '''\
+        Inverse of unrank_subpowerset(range(N), n, ., .), i.e., return the position of
+        the increasing tuple indices within subpowerset(range(N), n, .).
+    '''
+    return sum(comb(N, r) for r in range(n, len(indices))) + rank_combination(indices, N)
+
+
+def index_by_identity(sequence, item):
+    for i, candidate in enumerate(sequence):
+        if (candidate is item):
+            return i
+    raise ValueError("{} is not in the sequence.".format(item))
+
+
+def unrank_subpowerset(x, n, N, index):
+    '''\
+        Return the index-th element of subpowerset(x, n, N) without generating
+        any of the elements preceding it.
+    '''
+    for r in range(n, N + 1):
+        n_of_size_r = comb(len(x), r)
+        if (index < n_of_size_r):
+            return unrank_combination(x, r, index)
+        index -= n_of_size_r
+    raise IndexError("subpowerset index out of range")
+
+
+def unrank_permutation(x, index):
+    '''\
+        Return the index-th element of permutations(x) without generating
+        any of the elements preceding it (via the factorial number system).
+    '''
+    remaining = list(x)
+    result = []
+    for n_left in range(len(remaining), 0, -1):
+        i, index = divmod(index, factorial(n_left - 1))
+        result.append(remaining.pop(i))
+    return tuple(result)
+
+
+class MixedRadixSpace:
+    '''\
+        A random access sequence over the tuples of digits of product(*map(range, radices)),
+        in the same order (i.e., last digit varying fastest), minus a (small) set of
+        excluded ranks. Subclasses define decode() to turn digits into elements.
+
+        Supports indexing (by unranking), index() (by ranking, for subclasses which
+        define encode()) and uniform sampling. Its size is a Python int; use it (or
+        size_of()) rather than len(), which overflows past sys.maxsize.
+    '''
+    def __init__(self, radices, excluded_ranks=()):
+        self.radices = list(radices)
+        total = prod(self.radices)
+        self.excluded_ranks = sorted(set(rank for rank in excluded_ranks if (rank < total)))
+        self.size = total - len(self.excluded_ranks)
+
+    def decode(self, digits):
+        raise NotImplementedError("Each subclass of MixedRadixSpace must define this method with this signature on its own.")
+
+    def encode(self, element):
+        '''\
+            Inverse of decode(); raise ValueError if element is not in this space.
+        '''
+        raise NotImplementedError("{} cannot rank its elements.".format(type(self).__name__))
+
+    def exclude_from_rank(self, rank):
+        '''\
+            Return the index of the element at rank, skipping the excluded ranks.
+        '''
+        position = bisect_left(self.excluded_ranks, rank)
+        if (position < len(self.excluded_ranks)) and (self.excluded_ranks[position] == rank):
+            raise ValueError("The element at rank {} is excluded from this space.".format(rank))
+        return rank - position
+
+    def index(self, element):
+        '''\
+            Return the index of element, without generating any other element.
+        '''
+        rank = 0
+        for (digit, radix) in zip(self.encode(element), self.radices):
+            rank = rank * radix + digit
+        return self.exclude_from_rank(rank)
+
+    def digits(self, rank):
+        result = []
+        for radix in reversed(self.radices):
+            rank, digit = divmod(rank, radix)
+            result.append(digit)
+        result.reverse()
+        return result
+
+    def unrank(self, index):
+        rank = index
+        for excluded_rank in self.excluded_ranks:
+            if (excluded_rank <= rank):
+                rank += 1
+            else:
+                break
+        return self.decode(self.digits(rank))
+
+    def sample(self, rng=np.random, k=1):
+        '''\
+            Return k elements drawn uniformly (with replacement) from this space.
+        '''
+        return [self.unrank(random_below(self.size, rng)) for _ in range(k)]
+
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return self.size > 0
+
+    def __getitem__(self, index):
+        if (index < 0):
+            index += self.size
+        if not(0 <= index < self.size):
+            raise IndexError("{} index out of range".format(type(self).__name__))
+        return self.unrank(index)
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield self.unrank(index)
+
+
+###########################
+# Memoization Helper Class #
+###########################
+class LRUCache:
+    '''\
+        Bounded mapping which evicts entries once it holds more than maxsize of them;
+        either the least recently used entry (policy="lru") or the least recently
+        inserted one (policy="fifo"). Counts hits and misses of get().
+    '''
+    POLICIES = ("lru", "fifo")
+
+    def __init__(self, maxsize=1024, policy="lru"):
+        if not(policy in self.POLICIES):
+            raise ValueError("Unknown eviction policy: {}".format(policy))
+        self.maxsize = maxsize
+        self.policy = policy
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        if (key in self.entries):
+            self.hits += 1
+            if (self.policy == "lru"):
+                self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        if (key in self.entries) and (self.policy == "lru"):
+            self.entries.move_to_end(key)
+        self.entries[key] = value
+        self.evict()
+
+    def evict(self):
+        while (len(self.entries) > self.maxsize):
+            self.entries.popitem(last=False)
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        self.evict()
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        n_lookups = self.hits + self.misses
+        if n_lookups:
+            return self.hits / n_lookups
+        return 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __repr__(self):
+        return "LRUCache(size={}/{}, policy={}, hits={}, misses={})".format(len(self), self.maxsize, self.policy, self.hits, self.misses)
+
+
+class MutationClock:
+    '''\
+        Monotonic version counter which every mutator of state that bears on legality
+        ticks; anything cached under an older version is stale. Each Game has its own
+        (Game.mutation_clock), so that games do not invalidate each other's caches.
+    '''
+    def __init__(self):
+        self.version = 0
+
+    def tick(self):
+        self.version += 1
+
+
+def tick_mutation_clock(environment):
+    '''\
+        Tick the MutationClock of environment (a Game); pieces and players not (yet)
+        registered with a Game have no cache to invalidate.
+    '''
+    if (environment is not None):
+        environment.mutation_clock.tick()
+
+
+###########################
+# Graph Helper Functions #
+###########################
+def max_flow(capacities, source, sink):
+    '''\
+        Return the value of a maximum flow from source to sink (Edmonds-Karp), where
+        capacities is a dictionary of the form:
+            key   : (u, v) edge
+            value : capacity of the edge
+    '''
+    residual = defdict(int)
+    neighbours = defdict(set)
+    for (u, v), capacity in capacities.items():
+        residual[(u, v)] += capacity
+        neighbours[u].add(v)
+        neighbours[v].add(u)
+
+    flow = 0
+    while True:
+        # Breadth first search for a shortest augmenting path.
+        parents = {source: None}
+        frontier = [source]
+        while frontier and not(sink in parents):
+            next_frontier = []
+            for u in frontier:
+                for v in neighbours[u]:
+                    if not(v in parents) and (residual[(u, v)] > 0):
+                        parents[v] = u
+                        next_frontier.append(v)
+            frontier = next_frontier
+
+        # Case: No augmenting path left; the flow is maximum.
+        if not(sink in parents):
+            return flow
+
+        bottleneck = None
+        v = sink
+        while (parents[v] is not None):
+            u = parents[v]
+            if (bottleneck is None) or (residual[(u, v)] < bottleneck):
+                bottleneck = residual[(u, v)]
+            v = u
+        v = sink
+        while (parents[v] is not None):
+            u = parents[v]
+            residual[(u, v)] -= bottleneck
+            residual[(v, u)] += bottleneck
+            v = u
+        flow += bottleneck
+
+
 ############################################
 # Colour Constants for Terminal Formatting #
 ############################################
@@ -78,16 +443,158 @@ TEAM_COLORS = [HIY, HIR]
 
 TC_BUFFER_LINE = HIK+'________________________________________________________________________________\n'+RESET+''
 
-def tc_buffer():
-    print(TC_BUFFER_LINE)
+def tc_buffer(environment=None):
+    announce_to(environment, ANNOUNCE_INFO, "RULE", TC_BUFFER_LINE)
 
 def DP(object_name, object):
     print("{} <{}>: {}".format(object_name, type(object), object))
 
 
+######################
+# Announcement Sinks #
+######################
+# NOTE #
+# An announcement is a (level, category, fmt, args) record; fmt.format(*args), and so the
+# __repr__ of any piece or player in args, is only evaluated by a sink which emits it.
+# Levels and categories a sink filters out therefore cost (almost) nothing.
+ANNOUNCE_DEBUG = 10
+ANNOUNCE_ENGINE = 15
+ANNOUNCE_INFO = 20
+ANNOUNCE_LEVEL_NAMES = {ANNOUNCE_DEBUG: "DEBUG", ANNOUNCE_ENGINE: "ENGINE", ANNOUNCE_INFO: "INFO"}
+# Category -> (colour, text) of the boxed prefix printed by a TerminalSink; announcements
+# of any other category (e.g., "ACTION", "TBA", "RULE") are printed as is.
+ANNOUNCE_PREFIXES = {"EVENT": (HIW, "EVENT "),
+                     "ENGINE": (CYN, "ENGINE"),
+                     "DEBUG": (MAG, "DEBUG "),
+                     "COMBAT": (RED, "COMBAT")}
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;:]*m")
+
+
+def format_announcement(fmt, args):
+    if args:
+        return fmt.format(*args)
+    return fmt
+
+
+def announce_to(environment, level, category, fmt, *args):
+    '''\
+        Announce through the sink of environment (a Game), or print right away when
+        there is no environment to announce through.
+    '''
+    if (environment is None):
+        print(format_announcement(fmt, args))
+        return
+    environment.announce(level, category, fmt, *args)
+
+
+class AnnouncementSink:
+    '''\
+        Receives the announcements of at least a given level, of any category or only
+        of those in categories. Subclasses implement emit().
+    '''
+    def __init__(self, level=ANNOUNCE_DEBUG, categories=None):
+        self.level = level
+        self.categories = None if (categories is None) else frozenset(categories)
+
+    def enabled(self, level, category):
+        if (level < self.level):
+            return False
+        return (self.categories is None) or (category in self.categories)
+
+    def announce(self, level, category, fmt, args=()):
+        if self.enabled(level, category):
+            self.emit(level, category, fmt, args)
+
+    def emit(self, level, category, fmt, args):
+        raise NotImplementedError
+
+
+class NullSink(AnnouncementSink):
+    '''\
+        Headless mode: nothing is ever formatted or written.
+    '''
+    def enabled(self, level, category):
+        return False
+
+    def emit(self, level, category, fmt, args):
+        pass
+
+
+class TerminalSink(AnnouncementSink):
+    '''\
+        Print announcements in colour to stream (sys.stdout at the time of printing
+        by default), boxing the category of those listed in ANNOUNCE_PREFIXES.
+    '''
+    def __init__(self, level=ANNOUNCE_DEBUG, categories=None, stream=None):
+        super().__init__(level=level, categories=categories)
+        self.stream = stream
+
+    def emit(self, level, category, fmt, args):
+        announcement = format_announcement(fmt, args)
+        if (category in ANNOUNCE_PREFIXES):
+            (prefix_color, prefix) = ANNOUNCE_PREFIXES[category]
+            true_prefix = "{}{}{}".format(prefix_color, prefix, DEF).center(10)
+            announcement = "".join(["| ", true_prefix, " |", " {}{}{}".format(DEF, announcement, DEF)])
+        print(announcement, file=self.stream)
+
+
+class JSONLinesSink(AnnouncementSink):
+    '''\
+        Write one JSON object per announcement to stream, with its level, category and
+        message (stripped of colour codes).
+    '''
+    def __init__(self, stream, level=ANNOUNCE_DEBUG, categories=None):
+        super().__init__(level=level, categories=categories)
+        self.stream = stream
+
+    def emit(self, level, category, fmt, args):
+        record = {"level": ANNOUNCE_LEVEL_NAMES.get(level, level),
+                  "category": category,
+                  "message": ANSI_ESCAPE.sub("", format_announcement(fmt, args))}
+        self.stream.write(json.dumps(record) + "\n")
+
+
+class RingBufferSink(AnnouncementSink):
+    '''\
+        Keep the last maxlen announcements in memory as (level, category, message)
+        records. Each message is formatted as it is emitted, so that it records the
+        state at the time (args such as lists of attackers, or piece stats, change
+        afterwards), and so that no Piece, Player or Game is kept alive by the buffer.
+    '''
+    def __init__(self, maxlen=1024, level=ANNOUNCE_DEBUG, categories=None):
+        super().__init__(level=level, categories=categories)
+        self.records = deque(maxlen=maxlen)
+
+    def emit(self, level, category, fmt, args):
+        self.records.append((level, category, format_announcement(fmt, args)))
+
+    def messages(self):
+        return [message for (_, _, message) in self.records]
+
+    def clear(self):
+        self.records.clear()
+
+    def __len__(self):
+        return len(self.records)
+
+
+def size_of(options):
+    '''\
+        Return the number of options as a Python int; the size of sequences which
+        have one (e.g., MixedRadixSpace, BindingSequence), whose len() may overflow.
+    '''
+    size = getattr(options, "size", None)
+    if (size is not None):
+        return size
+    return len(options)
+
+
 def random_choice(options):
-    np.random.shuffle(options)
-    return options[0]
+    '''\
+        Uniformly choose one of options (any sequence supporting size_of() and
+        indexing) without mutating it.
+    '''
+    return options[random_below(size_of(options))]
 
 
 ##############################################
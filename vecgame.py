@@ -0,0 +1,193 @@
+from engine import *
+
+
+###################################################
+# Lockstep Batches of Independent Games (VecGame) #
+###################################################
+# NOTE #
+# Every game is advanced through the stepping interface of Game (reset() / step()) so
+# that, at any time, each of them is paused at exactly one DecisionPoint. The pending
+# decision points are collected into a DecisionBatch of arrays, which is what a batched
+# policy reads, and answered all at once with a vector of option indices.
+
+EPOCH_NAMES = ("Untap Step",
+               "Upkeep Step",
+               "Draw Step",
+               "Precombat Main Phase",
+               "Beginning Of Combat Step",
+               "Declare Attackers Step",
+               "Declare Blockers Step",
+               "Combat Damage Step",
+               "End Of Combat Step",
+               "Postcombat Main Phase",
+               "End Step",
+               "Cleanup Step")
+EPOCH_IDS = {epoch_name: i for i, epoch_name in enumerate(EPOCH_NAMES)}
+DECISION_KINDS = (DecisionPoint.ACTION, DecisionPoint.OPTION)
+DECISION_KIND_IDS = {kind: i for i, kind in enumerate(DECISION_KINDS)}
+# NOTE # Per-option features; each is -1 wherever an option is padding.
+#   ability_id : id of the option's ability (by name, see VecGame.ability_ids); 0 for passing
+#   target_id  : index among game.players + game.pieces of the option's first target
+#   n_targets  : number of players and pieces in the option's target subscope
+OPTION_FEATURES = ("ability_id", "target_id", "n_targets")
+PASS_ABILITY_ID = 0
+
+
+def iter_targets(target_subscope):
+    '''\
+        Generate the players and pieces of a target subscope, however nested (e.g., a
+        declaration of attackers, or of blockers), in order.
+    '''
+    if isinstance(target_subscope, dict):
+        for (key, value) in target_subscope.items():
+            yield from iter_targets(key)
+            yield from iter_targets(value)
+    elif isinstance(target_subscope, (tuple, list)):
+        for item in target_subscope:
+            yield from iter_targets(item)
+    elif (target_subscope is not None):
+        yield target_subscope
+
+
+class DecisionBatch:
+    '''\
+        The pending DecisionPoints of a VecGame, one per game, along with:
+            n_options  : number of options of each decision point, as Python ints (an
+                         object array), since lazy option spaces may exceed int64
+            player_ids : index of the deciding player in its game's players
+            epoch_ids  : index of the epoch's name in EPOCH_NAMES (-1 if unknown)
+            kind_ids   : index of the decision point's kind in DECISION_KINDS
+        ability_ids maps ability names to the ids of option_features(), and is added to
+        as new abilities show up (VecGame shares one across its batches).
+    '''
+    def __init__(self, decision_points, games, ability_ids=None):
+        self.decision_points = list(decision_points)
+        self.games = list(games)
+        self.ability_ids = ability_ids if (ability_ids is not None) else {}
+        self.n_options = np.array([decision_point.n_options for decision_point in self.decision_points], dtype=object)
+        self.player_ids = np.array([game.players.index(decision_point.player)
+                                    for (decision_point, game) in zip(self.decision_points, games)], dtype=np.int64)
+        self.epoch_ids = np.array([EPOCH_IDS.get(decision_point.epoch.msg, -1)
+                                   for decision_point in self.decision_points], dtype=np.int64)
+        self.kind_ids = np.array([DECISION_KIND_IDS[decision_point.kind]
+                                  for decision_point in self.decision_points], dtype=np.int64)
+
+    def n_columns(self, max_options):
+        return min(max(self.n_options, default=0), max_options)
+
+    def option_mask(self, max_options=64):
+        '''\
+            Return a boolean array of shape (n_games, K) flagging, row by row, which of
+            the first K = min(max n_options, max_options) option indices are legal.
+        '''
+        n_columns = self.n_columns(max_options)
+        n_present = np.array([min(n_options, n_columns) for n_options in self.n_options], dtype=np.int64)
+        return np.arange(n_columns) < n_present[:, None]
+
+    def ability_id(self, ability):
+        name = getattr(ability, "ability_name", None) or type(ability).__name__
+        if not(name in self.ability_ids):
+            self.ability_ids[name] = len(self.ability_ids) + 1
+        return self.ability_ids[name]
+
+    def option_features(self, max_options=64):
+        '''\
+            Return a 2-tuple of the form:
+                [0] int64 array of shape (n_games, K, len(OPTION_FEATURES)) holding, row
+                    by row, the OPTION_FEATURES of each option (-1 for padding)
+                [1] boolean array of shape (n_games, K) flagging the options present
+            where K = min(max n_options, max_options). Only the first K options of each
+            decision point are built; lazy option sequences are not enumerated further.
+        '''
+        n_columns = self.n_columns(max_options)
+        features = np.full((len(self), n_columns, len(OPTION_FEATURES)), -1, dtype=np.int64)
+        mask = self.option_mask(max_options)
+        for i, (decision_point, game) in enumerate(zip(self.decision_points, self.games)):
+            entity_ids = {id(entity): k for k, entity in enumerate(chain(game.players, game.pieces))}
+            for j in range(min(decision_point.n_options, n_columns)):
+                option = decision_point.options[j]
+                # Case: Passing.
+                if (option is None):
+                    features[i, j] = (PASS_ABILITY_ID, -1, 0)
+                    continue
+                target_ids = [entity_ids[id(target)] for target in iter_targets(option.target_subscope)
+                              if (id(target) in entity_ids)]
+                features[i, j] = (self.ability_id(option.ability),
+                                  target_ids[0] if target_ids else -1,
+                                  len(target_ids))
+        return features, mask
+
+    def sample(self, rng=np.random):
+        '''\
+            Return a list of one uniformly random option index (a Python int) per
+            decision point; see random_below().
+        '''
+        return [random_below(n_options, rng) for n_options in self.n_options]
+
+    def __len__(self):
+        return len(self.decision_points)
+
+    def __repr__(self):
+        return "DecisionBatch(n_games={}, n_options={})".format(len(self), self.n_options.tolist())
+
+
+class VecGame:
+    '''\
+        N independent games, built by game_factory() (a callable returning a fresh
+        Game), advanced in lockstep: step() answers every pending decision point at
+        once, and replaces any game which ended with a fresh one from game_factory().
+    '''
+    def __init__(self, game_factory, n_games):
+        self.game_factory = game_factory
+        self.n_games = n_games
+        self.games = [None] * n_games
+        self.decision_points = [None] * n_games
+        # Games which ended during the last call to step(), by index (None otherwise).
+        self.finished_games = [None] * n_games
+        self.n_decisions = 0
+        self.n_finished = 0
+        # Ability name -> id, shared by every DecisionBatch (see DecisionBatch.option_features).
+        self.ability_ids = {}
+
+    def reset_game(self, i):
+        game = self.game_factory()
+        decision_point = game.reset()
+        if (decision_point is None):
+            raise ValueError("game_factory() built a Game which ended without a single decision point.")
+        self.games[i] = game
+        self.decision_points[i] = decision_point
+
+    def reset(self):
+        '''\
+            Start N fresh games; return the DecisionBatch of their first decision points.
+        '''
+        for i in range(self.n_games):
+            self.reset_game(i)
+        self.finished_games = [None] * self.n_games
+        return self.batch()
+
+    def batch(self):
+        return DecisionBatch(self.decision_points, self.games, self.ability_ids)
+
+    def step(self, choices):
+        '''\
+            Answer the decision point of game i with option index choices[i], for each
+            game; return a 2-tuple of the form:
+                [0] DecisionBatch of the next decision points
+                [1] boolean array flagging the games which ended (and were reset)
+        '''
+        if (len(choices) != self.n_games):
+            raise ValueError("Expected {} choices, got {}.".format(self.n_games, len(choices)))
+        finished = np.zeros(self.n_games, dtype=bool)
+        for i, choice in enumerate(choices):
+            game = self.games[i]
+            self.finished_games[i] = None
+            self.decision_points[i] = game.step(int(choice))
+            self.n_decisions += 1
+            # Case: The game is over; keep it around for inspection and start another.
+            if (self.decision_points[i] is None):
+                finished[i] = True
+                self.finished_games[i] = game
+                self.n_finished += 1
+                self.reset_game(i)
+        return self.batch(), finished